@@ -5,16 +5,22 @@ from dotenv import load_dotenv
 # Load environment variables FIRST before any other imports
 load_dotenv()
 
-from fastapi import FastAPI, Depends, HTTPException, status, Request, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, status, Request, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime, timedelta
 import logging
 import json
+import orjson
 import asyncio
+import copy
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 # MongoDB imports
 from src.database.mongodb_manager import mongodb_manager
@@ -22,13 +28,20 @@ from src.database.mongodb_models import UserMongo, SessionMongo, MessageMongo, A
 from src.security.encryption import PHIEncryptionManager
 from src.compliance.disha_compliance import DISHAComplianceManager
 from bson import ObjectId
-from openai import OpenAI
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx
 from sarvamai import SarvamAI
+from cachetools import TTLCache, TLRUCache
 import base64
-import shutil
 import hashlib
+import importlib.util
+import time
 import wave
 import io
+import tempfile
 
 # Initialize blockchain (auto-detect PostgreSQL or SQLite)
 BLOCKCHAIN_DATABASE_URL = os.getenv("BLOCKCHAIN_DATABASE_URL")
@@ -53,7 +66,10 @@ except Exception as e:
 # Existing imports
 from src.workflow import HealthcareWorkflow
 from src.config import HealthcareConfig
-from src.auth.security import create_access_token, verify_password, get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+from src.auth.security import create_access_token, verify_password_async, get_password_hash_async, DUMMY_PASSWORD_HASH, ACCESS_TOKEN_EXPIRE_MINUTES
+from src.utils.llm_cache import ExactCache, LLMCache
+from src.utils.audio import compress_for_whisper, audio_cache_key, clean_text_for_tts, CachedAudioFiles
+from src.utils.audit_queue import AuditLogWriter
 from jose import JWTError, jwt
 
 # Initialize encryption manager
@@ -63,12 +79,20 @@ encryption_manager = PHIEncryptionManager()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Threads behind asyncio.to_thread (model loading, embeddings, Sarvam TTS, Firebase token checks)
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", min(32, (os.cpu_count() or 1) * 2 + 4)))
+
 # Lifespan context manager for startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting application...")
     
+    # Bound the worker's blocking-call pool explicitly (runs once per worker process)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="api-worker")
+    )
+    
     # Verify SECRET_KEY is loaded
     secret_key = os.getenv("SECRET_KEY")
     if not secret_key:
@@ -76,7 +100,17 @@ async def lifespan(app: FastAPI):
         raise RuntimeError("SECRET_KEY is required")
     logger.info(f"✅ SECRET_KEY loaded: {secret_key[:10]}...")
     
-    await mongodb_manager.connect()
+    # Warm OpenAI connections in the background (overlaps with the rest of startup)
+    warmup_task = asyncio.create_task(warm_openai_clients())
+    
+    # Model/vector-store loading and the MongoDB connection are independent - run them together
+    global config, workflow, response_cache
+    (config, workflow), _ = await asyncio.gather(
+        asyncio.to_thread(build_workflow),
+        mongodb_manager.connect()
+    )
+    response_cache = LLMCache(embed_fn=config.embedding_manager.embed_query)
+    audit_writer.start(mongodb_manager.db.audit_logs)
     
     # Fetch initial health news
     await fetch_initial_health_news()
@@ -88,6 +122,7 @@ async def lifespan(app: FastAPI):
     yield
     
     # Cancel background task on shutdown
+    warmup_task.cancel()
     refresh_task.cancel()
     try:
         await refresh_task
@@ -95,36 +130,71 @@ async def lifespan(app: FastAPI):
         pass
     # Shutdown
     logger.info("🛑 Shutting down application...")
+    await audit_writer.stop()
+    # Audit logs the writer just stored still have to reach the chain (and their proofs Mongo)
+    await drain_blockchain_logs()
     await mongodb_manager.close()
+    for openai_client in _openai_clients.values():
+        await openai_client.close()
     logger.info("✅ Application shutdown complete")
 
 app = FastAPI(
     title="Swastha - Healthcare AI Assistant",
     description="HIPAA-compliant healthcare chatbot with blockchain audit trail",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # Chat results (citations, videos, hospitals) are large
 )
 
 # CORS
 app.add_middleware(
     CORSMiddleware,
+    # Exact origins are a set lookup; Starlette treats "*" inside an origin literally,
+    # so preview deployments and tunnels are matched by the (precompiled) regex instead
     allow_origins=[
         "http://localhost:3000",
-        "https://*.vercel.app",
-        "https://pran-protocol-beff.vercel.app",  # All Vercel deployments
-        "https://*.ngrok-free.app",  # Ngrok tunnels
+        "https://pran-protocol-beff.vercel.app",
     ],
+    allow_origin_regex=r"https://(pran-protocol[a-z0-9-]*\.vercel\.app|[a-z0-9-]+\.ngrok-free\.app)",  # Vercel previews, ngrok tunnels
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Only what the frontend sends - lets browsers cache the preflight for a day
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["authorization", "content-type", "ngrok-skip-browser-warning"],
+    max_age=86400,
 )
 
 # OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-# Initialize workflow
-config = HealthcareConfig()
-workflow = HealthcareWorkflow(config)
+# Workflow is built in the lifespan, concurrently with the MongoDB connection
+config: Optional[HealthcareConfig] = None
+workflow: Optional[HealthcareWorkflow] = None
+
+def build_workflow():
+    """Load models, vector stores and chains (blocking - run in a thread)"""
+    workflow_config = HealthcareConfig()
+    return workflow_config, HealthcareWorkflow(workflow_config)
+
+# Response caches: exact replays first, then rephrased repeat queries
+# (the semantic cache needs the shared embedding model, so it is created with the workflow)
+exact_response_cache = ExactCache(maxsize=10_000, ttl_seconds=3600)
+response_cache: Optional[LLMCache] = None
+# Only non-clinical answers may be served for a merely similar query; health/medical
+# intents (symptoms, advisories, calculations, AYUSH, documents...) need an exact match
+SEMANTIC_CACHE_INTENTS = {"general_conversation", "government_scheme_support", "yoga_support"}
+# Exact-match replays of clinical answers are kept just long enough to absorb retries
+CLINICAL_EXACT_CACHE_TTL = 300
+# Semantic cache writes scheduled after a response (kept referenced until they finish)
+_cache_put_tasks: set = set()
+
+async def semantic_cache_put(scope: str, query: str, query_vector, result: dict):
+    """Add a workflow result to the semantic cache, embedding the query if the lookup didn't"""
+    try:
+        if query_vector is None:
+            query_vector = await response_cache.embed(query)
+        response_cache.put(scope, query_vector, result)
+    except Exception as e:
+        logger.warning(f"⚠️ Semantic cache write failed: {e}")
 
 # Background task to refresh health news every hour
 async def refresh_health_news_periodically():
@@ -161,25 +231,94 @@ logger.info("✅ DISHA Compliance Manager initialized")
 # Upload directory
 UPLOAD_DIR = "uploads"
 AUDIO_DIR = "audio_cache"
+AUDIO_PATH = Path(AUDIO_DIR)
+# TTS job markers and partial files - kept out of the publicly served AUDIO_DIR
+AUDIO_WORK_DIR = "audio_cache_work"
+# Public origin the browser uses to fetch /audio files
+BASE_URL = os.getenv("FRONTEND_BASE_URL", "http://127.0.0.1:8000")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(AUDIO_DIR, exist_ok=True)
+os.makedirs(AUDIO_WORK_DIR, exist_ok=True)
+
+# Filenames already in the audio cache (added to as TTS files are written) - cache-hit checks skip the stat
+KNOWN_AUDIO: set = set(os.listdir(AUDIO_DIR))
+
+logger.info(f"✅ Audio directory ready: {AUDIO_DIR} ({len(KNOWN_AUDIO)} cached files)")
+
+# Generated TTS audio, served directly by Starlette
+audio_files = CachedAudioFiles(directory=AUDIO_DIR, work_dir=AUDIO_WORK_DIR)
+app.mount("/audio", audio_files, name="audio")
+
+# Chat TTS jobs in flight; the audio mount tracks which files are still pending (across workers)
+_tts_tasks: set = set()
+
+# Shared async OpenAI clients (one per API key) - Whisper/TTS calls reuse pooled connections
+_openai_clients: dict = {}
+
+# HTTP/2 multiplexes concurrent OpenAI calls over a few connections; httpx needs the optional h2 package
+OPENAI_HTTP2 = importlib.util.find_spec("h2") is not None
+
+def get_openai_client(api_key: str) -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client for an API key, creating it on first use"""
+    client = _openai_clients.get(api_key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=api_key,
+            max_retries=2,
+            timeout=30,
+            http_client=DefaultAsyncHttpxClient(
+                http2=OPENAI_HTTP2,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=300)
+            ),
+        )
+        _openai_clients[api_key] = client
+    return client
 
-logger.info(f"✅ Audio directory ready: {AUDIO_DIR}")
+async def get_whisper_client() -> AsyncOpenAI:
+    """Dependency: shared OpenAI client for transcription (OPENAI_API_KEY with _1/_2 fallbacks)"""
+    # Explicitly get API Key with fallbacks
+    api_key = os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY_1") or os.getenv("OPENAI_API_KEY_2")
+    
+    if not api_key:
+        # Try reloading dotenv just in case
+        load_dotenv()
+        api_key = os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY_1") or os.getenv("OPENAI_API_KEY_2")
+        
+    if not api_key:
+        logger.error("❌ OPENAI_API_KEY (or variants) not found in environment variables!")
+        raise HTTPException(status_code=500, detail="Server misconfiguration: OPENAI_API_KEY missing.")
+    
+    return get_openai_client(api_key)
+
+async def warm_openai_clients():
+    """Open keep-alive connections for the TTS and Whisper keys so the first voice request skips the TLS handshake"""
+    transcribe_key = os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY_1") or os.getenv("OPENAI_API_KEY_2")
+    for api_key in {os.getenv("OPENAI_API_KEY_1"), transcribe_key} - {None}:
+        try:
+            await get_openai_client(api_key).models.list()
+        except Exception as e:
+            logger.warning(f"⚠️ OpenAI warm-up failed: {e}")
+    logger.info("🔥 OpenAI connections warmed")
 
 # Pydantic Models
 class Token(BaseModel):
     access_token: str
     token_type: str
 
+# Request size bounds - enforced by pydantic-core before any hashing, logging or DB work
+MAX_EMAIL_CHARS = 254
+MAX_QUERY_CHARS = 4096
+MAX_TTS_CHARS = 10_000
+
 class UserCreate(BaseModel):
-    email: str
-    password: str
+    email: str = Field(min_length=3, max_length=MAX_EMAIL_CHARS)
+    password: str = Field(min_length=8, max_length=128)
 
 class FirebaseLoginRequest(BaseModel):
-    id_token: str
-    email: str
-    display_name: Optional[str] = None
-    photo_url: Optional[str] = None
+    id_token: str = Field(max_length=4096)
+    email: str = Field(max_length=MAX_EMAIL_CHARS)
+    display_name: Optional[str] = Field(default=None, max_length=256)
+    photo_url: Optional[str] = Field(default=None, max_length=2048)
 
 class UserProfile(BaseModel):
     id: str
@@ -218,16 +357,59 @@ class SessionResponse(BaseModel):
     created_at: str
 
 class MessageCreate(BaseModel):
-    content: str
+    content: str = Field(max_length=MAX_QUERY_CHARS)
 
 class MessageResponse(BaseModel):
     role: str
     content: str
     timestamp: str
 
+# Verified token -> user document, so repeat requests skip Firebase verification and the users lookup
+USER_CACHE_TTL_SECONDS = 60
+
+def _user_cache_ttu(_key, value, now: float) -> float:
+    """Entries live for USER_CACHE_TTL_SECONDS, but never past the token's own exp"""
+    _, token_exp = value
+    expires_at = now + USER_CACHE_TTL_SECONDS
+    return min(expires_at, token_exp) if token_exp else expires_at
+
+# token digest -> (user document, token exp); wall-clock timer so exp can be compared directly
+_user_cache = TLRUCache(maxsize=10_000, ttu=_user_cache_ttu, timer=time.time)
+
+def invalidate_user_cache(user_id: ObjectId):
+    """Drop cached user documents after the user's record changes"""
+    for key, (cached, _) in list(_user_cache.items()):
+        if cached["_id"] == user_id:
+            _user_cache.pop(key, None)
+
 # Helper Functions
+def parse_object_id(value: str, name: str) -> ObjectId:
+    """Parse an id from the request once, rejecting malformed ones with a 400"""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail=f"Invalid {name}")
+
+# Cache misses in flight, so a burst of requests with one fresh token verifies it once
+_user_lookups: Dict[bytes, asyncio.Task] = {}
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     """Get current user from Firebase token (no JWT)"""
+    cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    cached = _user_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached[0])
+    
+    lookup = _user_lookups.get(cache_key)
+    if lookup is None:
+        lookup = asyncio.ensure_future(load_user_for_token(token, cache_key))
+        _user_lookups[cache_key] = lookup
+        lookup.add_done_callback(lambda _: _user_lookups.pop(cache_key, None))
+    # Shielded so one disconnecting client doesn't cancel the lookup the others are waiting on
+    return dict(await asyncio.shield(lookup))
+
+async def load_user_for_token(token: str, cache_key: bytes) -> dict:
+    """Verify a Firebase token, load its user and cache the result"""
     from src.auth.firebase_auth import verify_firebase_token
     
     credentials_exception = HTTPException(
@@ -258,33 +440,33 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
         raise credentials_exception
     
     logger.info(f"✅ Found user: {user.get('firebase_uid')}")
-    return user
+    _user_cache[cache_key] = (user, decoded_token.get("exp"))
     return user
 
-async def background_blockchain_log(log_id: ObjectId, user_id: ObjectId, action: str, resource_type: str, resource_id: Optional[ObjectId]):
-    """Background task to log to blockchain and update MongoDB"""
+async def background_blockchain_log(audit_logs: List[dict]):
+    """Background task to chain a batch of stored audit logs as one Merkle-rooted block and record the proof in MongoDB"""
     try:
-        if blockchain_logger and blockchain_logger.enabled:
-            blockchain_result = await blockchain_logger.log_action(
-                str(user_id),
-                action,
-                {"resource_type": resource_type, "resource_id": str(resource_id)}
-            )
-            if blockchain_result:
-                await mongodb_manager.db.audit_logs.update_one(
-                    {"_id": log_id},
-                    {
-                        "$set": {
-                            "blockchain_proof": {
-                                "tx_hash": blockchain_result["tx_hash"],
-                                "block_number": blockchain_result["block_number"],
-                                "verified": True
-                            },
-                            "blockchain_status": "verified"
-                        }
+        result = await blockchain_logger.log_actions([
+            (str(log["user_id"]), log["action"],
+             {"resource_type": log["resource_type"], "resource_id": str(log["resource_id"])})
+            for log in audit_logs
+        ])
+        if result:
+            await mongodb_manager.db.audit_logs.update_many(
+                {"_id": {"$in": [log["_id"] for log in audit_logs]}},
+                {
+                    "$set": {
+                        "blockchain_proof": {
+                            "tx_hash": result["tx_hash"],
+                            "block_number": result["block_number"],
+                            "merkle_root": result["merkle_root"],
+                            "verified": True
+                        },
+                        "blockchain_status": "verified"
                     }
-                )
-                logger.info(f"✅ Blockchain audit confirmed for log {log_id}")
+                }
+            )
+            logger.info(f"✅ Blockchain audit confirmed for {len(audit_logs)} logs")
     except Exception as e:
         logger.error(f"❌ Background blockchain logging failed: {e}")
 
@@ -293,8 +475,10 @@ async def log_audit(user_id: ObjectId, action: str, resource_type: str, resource
     ip_address = request.client.host if request.client else "unknown"
     user_agent = request.headers.get("user-agent", "unknown")
     
-    # Create audit log with pending status
+    # Create audit log with pending status - the _id is assigned here so the
+    # blockchain proof can reference it without waiting on the insert
     audit_log = {
+        "_id": ObjectId(),
         "user_id": user_id,
         "action": action,
         "resource_type": resource_type,
@@ -306,14 +490,44 @@ async def log_audit(user_id: ObjectId, action: str, resource_type: str, resource
         "blockchain_status": "pending"
     }
     
-    # Store in MongoDB FIRST (Fast)
-    result = await mongodb_manager.db.audit_logs.insert_one(audit_log)
-    
-    # Fire and forget blockchain logging
+    # Queued for a batched write; blockchain logging follows once it is stored
+    await audit_writer.put(audit_log)
+
+# Stored audit logs waiting for the chain, and the single task draining them
+_pending_chain_logs: List[dict] = []
+_chain_flush_task: Optional[asyncio.Task] = None
+# Upper bound on how long shutdown waits for them
+CHAIN_DRAIN_TIMEOUT = 30
+
+def schedule_blockchain_log(audit_logs: List[dict]):
+    """Queue a stored batch of audit logs for the blockchain (fire and forget)"""
+    global _chain_flush_task
     if blockchain_logger and blockchain_logger.enabled:
-        asyncio.create_task(background_blockchain_log(
-            result.inserted_id, user_id, action, resource_type, resource_id
-        ))
+        _pending_chain_logs.extend(audit_logs)
+        if _chain_flush_task is None or _chain_flush_task.done():
+            _chain_flush_task = asyncio.create_task(flush_blockchain_logs())
+
+async def flush_blockchain_logs():
+    """
+    Chain everything queued as one block, repeating until the queue is empty
+    Batches stored while a block is being mined are merged into the next one
+    """
+    while _pending_chain_logs:
+        batch = _pending_chain_logs[:]
+        _pending_chain_logs.clear()
+        await background_blockchain_log(batch)
+
+async def drain_blockchain_logs():
+    """Wait (bounded) for queued audit logs to be chained - called on shutdown"""
+    if _chain_flush_task is None:
+        return
+    try:
+        await asyncio.wait_for(asyncio.shield(_chain_flush_task), CHAIN_DRAIN_TIMEOUT)
+        logger.info("✅ Pending blockchain audit logs flushed")
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️ Shutdown timed out with {len(_pending_chain_logs)} audit logs not yet chained")
+
+audit_writer = AuditLogWriter(on_inserted=schedule_blockchain_log)
 
 
 # Authentication Endpoints
@@ -321,14 +535,10 @@ async def log_audit(user_id: ObjectId, action: str, resource_type: str, resource
 async def signup(user: UserCreate, request: Request):
     """Create new user with encrypted data"""
     try:
-        # Check if user exists
-        existing = await mongodb_manager.db.users.find_one({
-            "email_encrypted": encryption_manager.encrypt(user.email, encryption_manager.generate_user_salt())
-        })
-        
-        # Since we can't easily search encrypted data, we'll store a hash for lookup
+        # Check if user exists - encrypted emails can't be searched (random salt),
+        # so lookups go through the email hash
         email_hash = encryption_manager.hash_for_audit(user.email)
-        existing = await mongodb_manager.db.users.find_one({"email_hash": email_hash})
+        existing = await mongodb_manager.db.users.find_one({"email_hash": email_hash}, {"_id": 1})
         
         if existing:
             raise HTTPException(status_code=400, detail="Email already registered")
@@ -341,7 +551,8 @@ async def signup(user: UserCreate, request: Request):
             "firebase_uid": None,
             "email_encrypted": encryption_manager.encrypt(user.email, user_salt),
             "email_hash": email_hash,  # For lookup
-            "password_hash": get_password_hash(user.password),
+            "anonymous_id": compliance_manager.anonymizer.create_anonymous_id(user.email),
+            "password_hash": await get_password_hash_async(user.password),
             "display_name_encrypted": None,
             "photo_url": None,
             "encryption_key_id": user_salt,
@@ -379,18 +590,26 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), request: Reque
         email_hash = encryption_manager.hash_for_audit(form_data.username)
         user = await mongodb_manager.db.users.find_one({"email_hash": email_hash})
         
-        if not user or not verify_password(form_data.password, user["password_hash"]):
+        # Always run bcrypt (dummy hash for unknown emails) so response time doesn't reveal which accounts exist
+        target_hash = user.get("password_hash") if user else None
+        password_ok = await verify_password_async(form_data.password, target_hash or DUMMY_PASSWORD_HASH)
+        if not (user and target_hash and password_ok):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Update last login
+        # Update last login (and store the anonymous ID on older accounts while the email is in hand)
+        login_updates = {"last_login": datetime.utcnow()}
+        if not user.get("anonymous_id"):
+            login_updates["anonymous_id"] = compliance_manager.anonymizer.create_anonymous_id(form_data.username)
         await mongodb_manager.db.users.update_one(
             {"_id": user["_id"]},
-            {"$set": {"last_login": datetime.utcnow()}}
+            {"$set": login_updates}
         )
+        if "anonymous_id" in login_updates:
+            invalidate_user_cache(user["_id"])
         
         # Audit log
         await log_audit(user["_id"], "LOGIN", "user", user["_id"], request)
@@ -423,8 +642,16 @@ async def firebase_login(request_data: FirebaseLoginRequest, request: Request):
         firebase_uid = decoded_token.get("uid")
         email = decoded_token.get("email") or request_data.email
         
-        # Find or create user
-        user = await mongodb_manager.db.users.find_one({"firebase_uid": firebase_uid})
+        # Returning user (the common case): stamp the login and get the record back in one round trip
+        now = datetime.utcnow()
+        login_updates = {"last_login": now}
+        if request_data.photo_url:
+            login_updates["photo_url"] = request_data.photo_url
+        user = await mongodb_manager.db.users.find_one_and_update(
+            {"firebase_uid": firebase_uid},
+            {"$set": login_updates},
+            return_document=ReturnDocument.AFTER
+        )
         
         if not user:
             # Create new user
@@ -435,38 +662,53 @@ async def firebase_login(request_data: FirebaseLoginRequest, request: Request):
                 "firebase_uid": firebase_uid,
                 "email_encrypted": encryption_manager.encrypt(email, user_salt),
                 "email_hash": email_hash,
-                "password_hash": get_password_hash(os.urandom(32).hex()),  # Random password
+                "anonymous_id": compliance_manager.anonymizer.create_anonymous_id(email),
+                "password_hash": None,  # Google sign-in only - password login always fails (no bcrypt needed)
                 "display_name_encrypted": encryption_manager.encrypt(request_data.display_name, user_salt) if request_data.display_name else None,
                 "photo_url": request_data.photo_url,
                 "encryption_key_id": user_salt,
-                "created_at": datetime.utcnow(),
-                "last_login": datetime.utcnow(),
+                "created_at": now,
+                "last_login": now,
                 "mfa_enabled": False,
                 "consent_agreements": [],
                 "blockchain_identity": None
             }
             
-            result = await mongodb_manager.db.users.insert_one(user_doc)
-            user = await mongodb_manager.db.users.find_one({"_id": result.inserted_id})
-            
-            await log_audit(result.inserted_id, "FIREBASE_SIGNUP", "user", result.inserted_id, request)
+            try:
+                # insert_one fills in user_doc["_id"] - no need to read the user back
+                await mongodb_manager.db.users.insert_one(user_doc)
+                await log_audit(user_doc["_id"], "FIREBASE_SIGNUP", "user", user_doc["_id"], request)
+            except DuplicateKeyError:
+                # A concurrent first login created the account (unique firebase_uid index)
+                user = await mongodb_manager.db.users.find_one_and_update(
+                    {"firebase_uid": firebase_uid},
+                    {"$set": login_updates},
+                    return_document=ReturnDocument.AFTER
+                )
+                if not user:
+                    # The duplicate key came from another unique index, not a racing login
+                    logger.warning(f"⚠️ Firebase sign-up conflicted with an existing account (uid {firebase_uid})")
+                    raise HTTPException(status_code=409, detail="Account conflicts with an existing user")
+                await log_audit(user["_id"], "FIREBASE_LOGIN", "user", user["_id"], request)
         else:
-            # Update profile if changed
-            updates = {}
+            # Display name is encrypted, so it can only be compared after decrypting
             if request_data.display_name and user.get("display_name_encrypted"):
                 user_salt = user["encryption_key_id"]
                 decrypted_name = encryption_manager.decrypt(user["display_name_encrypted"], user_salt)
                 if decrypted_name != request_data.display_name:
-                    updates["display_name_encrypted"] = encryption_manager.encrypt(request_data.display_name, user_salt)
-            
-            if request_data.photo_url and user.get("photo_url") != request_data.photo_url:
-                updates["photo_url"] = request_data.photo_url
-            
-            updates["last_login"] = datetime.utcnow()
+                    await mongodb_manager.db.users.update_one(
+                        {"_id": user["_id"]},
+                        {"$set": {"display_name_encrypted": encryption_manager.encrypt(request_data.display_name, user_salt)}}
+                    )
             
-            if updates:
-                await mongodb_manager.db.users.update_one({"_id": user["_id"]}, {"$set": updates})
+            # Older accounts: store the anonymous ID now, while the email is in hand
+            if not user.get("anonymous_id") and email:
+                await mongodb_manager.db.users.update_one(
+                    {"_id": user["_id"]},
+                    {"$set": {"anonymous_id": compliance_manager.anonymizer.create_anonymous_id(email)}}
+                )
             
+            invalidate_user_cache(user["_id"])
             await log_audit(user["_id"], "FIREBASE_LOGIN", "user", user["_id"], request)
         
         # Return the Firebase token directly (no JWT needed)
@@ -523,7 +765,6 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
         # Decrypt address
         address = None
         if current_user.get("address_encrypted") and user_salt:
-            import json
             decrypted_address = encryption_manager.decrypt(current_user["address_encrypted"], user_salt)
             try:
                 address = json.loads(decrypted_address)
@@ -549,7 +790,9 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
             decrypted = encryption_manager.decrypt(current_user["previous_conditions_encrypted"], user_salt)
             previous_conditions = [p.strip() for p in decrypted.split(",") if p.strip()]
         
-        return UserProfile(
+        # Already a validated UserProfile - returning the Response directly skips
+        # FastAPI's dump + re-validate pass against response_model (kept for the schema)
+        return ORJSONResponse(UserProfile(
             id=str(current_user["_id"]),
             email=email,
             display_name=display_name,
@@ -561,7 +804,7 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
             medications=medications,
             previous_conditions=previous_conditions,
             address=address
-        )
+        ).model_dump())
     except Exception as e:
         logger.error(f"Profile fetch error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -593,6 +836,7 @@ async def update_user_profile(
                 {"_id": user_id}, 
                 {"$set": {"encryption_key_id": user_salt}}
             )
+            invalidate_user_cache(user_id)
             logger.info(f"✅ Created encryption key for user {user_id}")
 
         # 2. Prepare the update dictionary
@@ -612,7 +856,6 @@ async def update_user_profile(
         
         if profile_data.address:
             # Convert address to JSON string, then encrypt
-            import json
             address_json = json.dumps(profile_data.address.dict())
             encrypted_address = encryption_manager.encrypt(address_json, user_salt)
             update_fields["address_encrypted"] = encrypted_address
@@ -649,6 +892,8 @@ async def update_user_profile(
             {"_id": user_id},
             {"$set": update_fields}
         )
+        invalidate_user_cache(user_id)
+        invalidate_chat_profile(user_id)
         
         logger.info(f"✅ MongoDB update result: matched={result.matched_count}, modified={result.modified_count}")
         
@@ -738,11 +983,83 @@ def chunk_text(text, max_chars=450):
         
     return chunks
 
+async def start_chat_audio(result, session_id) -> Tuple[str, bool]:
+    """
+    Resolve the cached OpenAI TTS file for a chat response, starting synthesis in
+    the background if it doesn't exist yet. Returns (audio URL, ready).
+    """
+    # Get text to speak
+    raw_output = result.get("output") if isinstance(result, dict) else result
+    tts_input = raw_output if isinstance(raw_output, str) else str(raw_output)
+    
+    # Clean text for TTS (but keep in displayed text)
+    tts_input = clean_text_for_tts(tts_input)
+    
+    # Create cache filename
+    text_hash = audio_cache_key(tts_input)
+    filename = f"{text_hash}.mp3"
+    audio_url = f"{BASE_URL}/audio/{filename}"
+    
+    # Cache hit (disk check covers files written by other workers)
+    if filename in KNOWN_AUDIO or (AUDIO_PATH / filename).exists():
+        KNOWN_AUDIO.add(filename)
+        logger.info(f"TTS cache hit: {filename}")
+        return audio_url, True
+    
+    # Don't start a second job for the same text (begin() also sees jobs in other workers)
+    if await audio_files.begin(filename):
+        task = asyncio.create_task(synthesize_chat_audio(tts_input, filename, session_id))
+        _tts_tasks.add(task)
+        task.add_done_callback(_tts_tasks.discard)
+    return audio_url, False
+
+async def synthesize_chat_audio(tts_input: str, filename: str, session_id):
+    """Background OpenAI TTS job; GETs for the file wait until audio_files.finish()"""
+    # Use primary OpenAI key for TTS
+    client = get_openai_client(os.getenv("OPENAI_API_KEY_1"))
+    tts_path = AUDIO_PATH / filename
+    
+    logger.info(f"Generating TTS for session {session_id}")
+    # Stream the MP3 to disk as it is synthesized (no full in-memory copy) and
+    # publish it with an atomic rename so a partial file is never served
+    part_path = audio_files.part_path(filename)
+    try:
+        async with client.audio.speech.with_streaming_response.create(
+            model="tts-1",
+            voice="alloy",
+            input=tts_input[:4096],
+            response_format="mp3"
+        ) as speech:
+            # SDK writes chunks as they arrive, with async file I/O
+            await speech.stream_to_file(part_path)
+        await asyncio.to_thread(os.replace, part_path, tts_path)
+        KNOWN_AUDIO.add(filename)
+        logger.info(f"TTS generated: {filename}")
+    except Exception as e:
+        logger.error(f"TTS generation failed: {e}")
+        await asyncio.to_thread(Path(part_path).unlink, missing_ok=True)
+    finally:
+        await audio_files.finish(filename)
+
 # ==================== TTS ENDPOINT (SARVAM AI) ====================
 
+_sarvam_clients: dict = {}
+# Per-request Sarvam fan-out: concurrent chunk calls, and retries with exponential backoff per chunk
+TTS_CHUNK_CONCURRENCY = 3
+TTS_CHUNK_ATTEMPTS = 3
+TTS_RETRY_BACKOFF = 0.5
+
+def get_sarvam_client(api_key: str) -> SarvamAI:
+    """Shared Sarvam client per API key (reuses its HTTP session across requests)"""
+    client = _sarvam_clients.get(api_key)
+    if client is None:
+        client = SarvamAI(api_subscription_key=api_key)
+        _sarvam_clients[api_key] = client
+    return client
+
 class TTSRequest(BaseModel):
-    text: str
-    language_code: Optional[str] = "en-IN"
+    text: str = Field(max_length=MAX_TTS_CHARS)
+    language_code: Optional[str] = Field(default="en-IN", max_length=16)
 
 @app.post("/tts")
 async def text_to_speech(request: TTSRequest, current_user: dict = Depends(get_current_user)):
@@ -750,39 +1067,17 @@ async def text_to_speech(request: TTSRequest, current_user: dict = Depends(get_c
     Convert text to speech using Sarvam AI with caching and speed control
     """
     try:
-        import re
-        
         # Clean text for TTS (remove all formatting and special characters)
-        text_for_tts = request.text
-        
-        # Remove citations
-        text_for_tts = re.sub(r'\[Source:.*?\]', '', text_for_tts)
-        text_for_tts = re.sub(r'\[\d+\]', '', text_for_tts)
-        text_for_tts = re.sub(r'\[Citation:.*?\]', '', text_for_tts)
-        
-        # Remove markdown formatting
-        text_for_tts = re.sub(r'#{1,6}\s*', '', text_for_tts)  # Headers
-        text_for_tts = re.sub(r'\*\*(.*?)\*\*', r'\1', text_for_tts)  # Bold
-        text_for_tts = re.sub(r'\*(.*?)\*', r'\1', text_for_tts)  # Italic
-        text_for_tts = re.sub(r'`(.*?)`', r'\1', text_for_tts)  # Code
-        text_for_tts = re.sub(r'^\s*[-*+]\s+', '', text_for_tts, flags=re.MULTILINE)  # Lists
-        text_for_tts = re.sub(r'^\s*\d+\.\s+', '', text_for_tts, flags=re.MULTILINE)  # Numbered lists
-        
-        # Remove emojis and special symbols
-        text_for_tts = re.sub(r'[^\w\s,.!?;:()\-\'/"]', '', text_for_tts)
-        
-        # Clean up spacing
-        text_for_tts = re.sub(r'\n+', '. ', text_for_tts)
-        text_for_tts = re.sub(r'\s+', ' ', text_for_tts).strip()
+        text_for_tts = clean_text_for_tts(request.text)
         
         # 1. Caching Mechanism
         # Normalize text for hash: strip and lower to catch duplicates better
         normalized_text = text_for_tts.strip().lower()
         # Include params in hash to differentiate quality settings
         hash_input = f"{normalized_text}_{request.language_code}_anushka_v2_24k"
-        text_hash = hashlib.md5(hash_input.encode()).hexdigest()
+        text_hash = audio_cache_key(hash_input)
         cache_filename = f"tts_{text_hash}.wav"
-        cache_path = os.path.join(AUDIO_DIR, cache_filename)
+        cache_path = AUDIO_PATH / cache_filename
         
         # Check if already cached
         if os.path.exists(cache_path):
@@ -791,10 +1086,9 @@ async def text_to_speech(request: TTSRequest, current_user: dict = Depends(get_c
             
             # Additional check: If file is too small, it might be corrupted/failed previous run
             if file_size > 1000:
-                with open(cache_path, "rb") as f:
-                    audio_content = f.read()
-                    audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-                    return {"audio_url": f"data:audio/wav;base64,{audio_base64}"}
+                audio_content = await asyncio.to_thread(cache_path.read_bytes)
+                audio_base64 = base64.b64encode(audio_content).decode('utf-8')
+                return {"audio_url": f"data:audio/wav;base64,{audio_base64}"}
             else:
                 logger.warning(f"⚠️ Cache file too small ({file_size}b), regenerating: {cache_filename}")
         else:
@@ -810,7 +1104,7 @@ async def text_to_speech(request: TTSRequest, current_user: dict = Depends(get_c
              logger.error("❌ SARVAM_API_KEY not found in env even after reload")
              raise HTTPException(status_code=500, detail="TTS service not configured (missing key)")
 
-        client = SarvamAI(api_subscription_key=api_key)
+        client = get_sarvam_client(api_key)
         
         # 3. Process Text with Chunking (use cleaned text without citations)
         text_full = text_for_tts.strip()
@@ -821,37 +1115,47 @@ async def text_to_speech(request: TTSRequest, current_user: dict = Depends(get_c
         chunks = chunk_text(text_full, max_chars=400) 
         logger.info(f"🔊 Generating TTS for {len(text_full)} chars | Split into {len(chunks)} chunks")
         
-        audio_segments = []
+        # Chunks are synthesized concurrently (bounded, to stay under Sarvam rate limits);
+        # the blocking SDK call runs in a worker thread so other requests keep flowing
+        chunk_limiter = asyncio.Semaphore(TTS_CHUNK_CONCURRENCY)
         
-        for i, chunk in enumerate(chunks):
+        async def synthesize_chunk(i, chunk):
             logger.info(f"  • Processing chunk {i+1}/{len(chunks)} ({len(chunk)} chars): {chunk[:30]}...")
             logger.info(f"  • Language: {request.language_code}")
-            try:
-                response = client.text_to_speech.convert(
-                    text=chunk,
-                    target_language_code=request.language_code,
-                    speaker="anushka",
-                    pace=0.9,              # Slow and steady
-                    pitch=-0.2,             # Slightly lower for softer tone
-                    loudness=1.0,           # Balanced loudness
-                    speech_sample_rate=24000, # Premium 24kHz quality
-                    enable_preprocessing=True
-                )
-                
-                if hasattr(response, "audios") and response.audios:
-                    b64_data = response.audios[0]
-                    # Verify b64 data
-                    if len(b64_data) < 100:
-                        logger.warning(f"  ⚠️ Chunk {i} returned suspiciously small audio")
+            for attempt in range(1, TTS_CHUNK_ATTEMPTS + 1):
+                try:
+                    async with chunk_limiter:
+                        response = await asyncio.to_thread(
+                            client.text_to_speech.convert,
+                            text=chunk,
+                            target_language_code=request.language_code,
+                            speaker="anushka",
+                            pace=0.9,              # Slow and steady
+                            pitch=-0.2,             # Slightly lower for softer tone
+                            loudness=1.0,           # Balanced loudness
+                            speech_sample_rate=24000, # Premium 24kHz quality
+                            enable_preprocessing=True
+                        )
                     
-                    audio_segments.append(base64.b64decode(b64_data))
-                    logger.info(f"  ✅ Chunk {i+1} success")
-                else:
-                    logger.warning(f"  ❌ Chunk {i} failed: No audio in response")
-            except Exception as e:
-                logger.error(f"  ❌ Chunk {i} error: {e}")
-                # Wait a bit between chunks to avoid rate limits?
-                await asyncio.sleep(0.5)
+                    if hasattr(response, "audios") and response.audios:
+                        b64_data = response.audios[0]
+                        # Verify b64 data
+                        if len(b64_data) < 100:
+                            logger.warning(f"  ⚠️ Chunk {i} returned suspiciously small audio")
+                        
+                        logger.info(f"  ✅ Chunk {i+1} success")
+                        return base64.b64decode(b64_data)
+                    logger.warning(f"  ❌ Chunk {i} failed (attempt {attempt}/{TTS_CHUNK_ATTEMPTS}): No audio in response")
+                except Exception as e:
+                    logger.error(f"  ❌ Chunk {i} error (attempt {attempt}/{TTS_CHUNK_ATTEMPTS}): {e}")
+                # Back off outside the limiter so other chunks can use the slot (likely a rate limit)
+                if attempt < TTS_CHUNK_ATTEMPTS:
+                    await asyncio.sleep(TTS_RETRY_BACKOFF * 2 ** (attempt - 1))
+            return None
+        
+        # gather keeps chunk order; failed chunks are dropped as before
+        chunk_audio = await asyncio.gather(*(synthesize_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+        audio_segments = [segment for segment in chunk_audio if segment is not None]
         
         if not audio_segments:
              raise HTTPException(status_code=500, detail="Failed to generate audio for all chunks")
@@ -864,8 +1168,7 @@ async def text_to_speech(request: TTSRequest, current_user: dict = Depends(get_c
 
         # 5. Save to Cache
         try:
-            with open(cache_path, "wb") as f:
-                f.write(final_audio)
+            await asyncio.to_thread(cache_path.write_bytes, final_audio)
             logger.info(f"💾 Saved stitched TTS to cache: {cache_filename}")
         except Exception as e:
             logger.error(f"⚠️ Failed to cache TTS audio: {e}")
@@ -880,68 +1183,201 @@ async def text_to_speech(request: TTSRequest, current_user: dict = Depends(get_c
 
 # ==================== CHAT & SESSION ENDPOINTS ====================
 
+WHISPER_MAX_BYTES = 25 * 1024 * 1024
+WHISPER_TOO_LARGE = "Audio file too large (max 25 MB)"
+# Uploads are copied in chunks of this size (peak memory per upload stays constant)
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# Audio uploads larger than this are spooled to a temp file instead of memory
+AUDIO_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
 @app.post("/transcribe")
 async def transcribe_audio(
     file: UploadFile = File(...),
     locale: str = Form("en"),  # Accept locale from form data
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    client: AsyncOpenAI = Depends(get_whisper_client)
 ):
     """
     Transcribes uploaded audio file using OpenAI Whisper with language hint.
     Expects 'file' and 'locale' in multipart/form-data.
     """
-    temp_filename = f"temp_{file.filename}"
+    # Whisper rejects files over 25 MB - fail on the declared size before reading anything
+    if file.size is not None and file.size > WHISPER_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=WHISPER_TOO_LARGE)
+    
+    # Copied in chunks rather than one file.read(): short clips stay in memory, longer ones
+    # spill to disk, and the writes (which may hit disk) run off the event loop
+    audio_file = tempfile.SpooledTemporaryFile(max_size=AUDIO_SPOOL_MAX_BYTES)
     try:
-        # Save uploaded file temporarily
-        with open(temp_filename, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Explicitly get API Key with fallbacks
-        api_key = os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY_1") or os.getenv("OPENAI_API_KEY_2")
-        
-        if not api_key:
-            # Try reloading dotenv just in case
-            load_dotenv()
-            api_key = os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY_1") or os.getenv("OPENAI_API_KEY_2")
-            
-        if not api_key:
-            logger.error("❌ OPENAI_API_KEY (or variants) not found in environment variables!")
-            raise HTTPException(status_code=500, detail="Server misconfiguration: OPENAI_API_KEY missing.")
-        
-        # Initialize OpenAI client with explicit key
-        client = OpenAI(api_key=api_key)
+        audio_size = 0
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            audio_size += len(chunk)
+            # The declared size can be missing or wrong - enforce the limit on what actually arrives
+            if audio_size > WHISPER_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=WHISPER_TOO_LARGE)
+            await asyncio.to_thread(audio_file.write, chunk)
+        audio_file.seek(0)
+        
+        audio_data, audio_name = await asyncio.to_thread(
+            compress_for_whisper, audio_file, audio_size, file.filename or "audio.webm"
+        )
+        # (filename, file, content type) tuple - the SDK uploads the contents as-is
+        audio_type = file.content_type if audio_name == file.filename else "audio/mpeg"
+        audio_upload = (audio_name, audio_data, audio_type or "audio/webm")
         
         # Map locale to Whisper language codes
         language_hint = "hi" if locale == "hi" else "en"
         
-        with open(temp_filename, "rb") as audio_file:
-            # Pass language hint to help Whisper recognize the correct language
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1", 
-                file=audio_file,
-                language=language_hint,  # Tell Whisper to expect this language
-                response_format="verbose_json"  # Get language detection info
-            )
+        # Pass language hint to help Whisper recognize the correct language
+        transcript = await client.audio.transcriptions.create(
+            model="whisper-1", 
+            file=audio_upload,
+            language=language_hint,  # Tell Whisper to expect this language
+            response_format="json"  # Text only - no per-segment timings to generate and parse
+        )
         
-        detected_language = getattr(transcript, 'language', language_hint)
-        logger.info(f"✅ Transcription successful: '{transcript.text[:50]}...' (hint: {language_hint}, detected: {detected_language})")
-        return {"text": transcript.text, "language": detected_language}
+        # With an explicit language Whisper transcribes in that language, so the hint is the answer
+        logger.info(f"✅ Transcription successful: '{transcript.text[:50]}...' (language: {language_hint})")
+        return {"text": transcript.text, "language": language_hint}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Transcription failed: {e}")
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
     finally:
-        # Cleanup temp file
-        if os.path.exists(temp_filename):
-            os.remove(temp_filename)
+        audio_file.close()
 
 class ChatRequest(BaseModel):
-    query: str  # Changed from 'message' to match frontend
-    session_id: Optional[str] = None  # Changed to str for ObjectId compatibility
+    query: str = Field(min_length=1, max_length=MAX_QUERY_CHARS)  # Changed from 'message' to match frontend
+    session_id: Optional[str] = Field(default=None, max_length=24)  # Changed to str for ObjectId compatibility
     generate_audio: Optional[bool] = False
-    latitude: Optional[float] = None  # User's location for emergency services
-    longitude: Optional[float] = None
-    locale: Optional[str] = "en"  # User's language preference (en or hi)
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)  # User's location for emergency services
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+    locale: Optional[str] = Field(default="en", max_length=10)  # User's language preference (en or hi)
+
+# user_id -> (ciphertext fingerprint, decrypted chat profile). Only the prompt fields are
+# kept (never the email), and entries are dropped when the profile changes. The fingerprint
+# also catches changes made through another worker - every update re-encrypts with a fresh token
+_chat_profile_cache = TTLCache(maxsize=10_000, ttl=600)
+CHAT_PROFILE_FIELDS = ("age", "gender", "medical_history", "medications", "allergies")
+# Profile fields the workflow can update and /chat writes back
+PROFILE_SYNC_FIELDS = ("age", "gender", "medical_history", "medications")
+
+def invalidate_chat_profile(user_id: ObjectId):
+    """Drop the user's decrypted chat profile after their profile changes"""
+    _chat_profile_cache.pop(user_id, None)
+
+def decrypt_chat_profile(current_user: dict) -> Tuple[dict, str]:
+    """The user's profile fields for the chat prompt (decrypted once per change) plus their email"""
+    user_id = current_user["_id"]
+    user_salt = current_user.get("encryption_key_id")
+    # Only needed to derive the anonymous id - one token, not worth keeping in memory
+    user_email = encryption_manager.decrypt(current_user.get("email_encrypted", ""), user_salt)
+    fingerprint = (
+        user_salt,
+        *(current_user.get(f"{field}_encrypted") for field in CHAT_PROFILE_FIELDS),
+        current_user.get("age"), current_user.get("gender"),  # legacy plaintext fallbacks
+    )
+    cached = _chat_profile_cache.get(user_id)
+    if cached is not None and cached[0] == fingerprint:
+        return dict(cached[1]), user_email
+    
+    # Decrypt age
+    age = None
+    if current_user.get("age_encrypted") and user_salt:
+        decrypted_age = encryption_manager.decrypt(current_user["age_encrypted"], user_salt)
+        try:
+            age = int(decrypted_age)
+        except (ValueError, TypeError):
+            age = None
+    elif current_user.get("age"):
+        age = current_user.get("age")
+    
+    # Decrypt gender
+    gender = None
+    if current_user.get("gender_encrypted") and user_salt:
+        gender = encryption_manager.decrypt(current_user["gender_encrypted"], user_salt)
+    elif current_user.get("gender"):
+        gender = current_user.get("gender")
+    
+    profile = {
+        "user_id": user_id,
+        "age": age,
+        "gender": gender,
+        "medical_history": "[]",
+        "allergies": "[]",
+        "medications": "[]",
+        "language_preference": "en"
+    }
+    
+    # Decrypt medical data if encrypted
+    for field in ("medical_history", "medications", "allergies"):
+        if current_user.get(f"{field}_encrypted") and user_salt:
+            profile[field] = encryption_manager.decrypt(current_user[f"{field}_encrypted"], user_salt)
+    
+    _chat_profile_cache[user_id] = (fingerprint, profile)
+    return dict(profile), user_email
+
+def format_history_content(content) -> str:
+    """Message content for the history prompt (older messages may store the workflow dict)"""
+    if isinstance(content, dict):
+        return content.get("output", str(content))
+    return content
+
+# Query shapes for the hot /chat path, built once instead of per request.
+# Projections keep Motor from decoding fields the handler never reads.
+SESSION_ID_PROJECTION = {"_id": 1}
+RECENT_DOCS_PROJECTION = {"_id": 0, "file_name": 1, "analysis": 1, "full_text_encrypted": 1}
+RECENT_DOCS_SORT = [("upload_date", -1)]
+RECENT_DOCS_LIMIT = 5
+HISTORY_PROJECTION = {"_id": 0, "role": 1, "content": 1}
+HISTORY_SORT = [("timestamp", -1)]
+HISTORY_LIMIT = 5
+# Session sidebar rows, shaped server-side into exactly what the response returns
+SESSION_LIST_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "title": {"$ifNull": ["$title", "Untitled"]},
+    "created_at": 1,
+    "updated_at": 1,
+}
+MESSAGE_LIST_PROJECTION = {"_id": 0, "role": 1, "content": 1, "timestamp": 1}
+
+# (session_id, user_id) pairs whose ownership was verified recently. Sessions are archived,
+# never deleted or reassigned, so a positive result stays valid; the TTL just bounds memory.
+_session_owner_cache = TTLCache(maxsize=50_000, ttl=600)
+
+async def fetch_recent_history(session_id: ObjectId) -> List[dict]:
+    """Last HISTORY_LIMIT messages of a session, newest first on the (session_id, timestamp) index"""
+    return await mongodb_manager.db.messages.find(
+        {"session_id": session_id},
+        HISTORY_PROJECTION
+    ).sort(HISTORY_SORT).limit(HISTORY_LIMIT).to_list(length=HISTORY_LIMIT)
+
+async def persist_chat_turn(session_id: ObjectId, message_docs: List[dict], user_msg_chain_task: Optional[asyncio.Task] = None):
+    """Store a chat turn's messages and bump the session timestamp (runs after the response)"""
+    try:
+        # One write for both sides of the turn - don't hold it back for the chain
+        await mongodb_manager.db.messages.insert_many(message_docs)
+        await mongodb_manager.db.sessions.update_one(
+            {"_id": session_id},
+            {"$set": {"updated_at": message_docs[-1]["timestamp"]}}
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to persist chat turn for session {session_id}: {e}")
+        return
+    
+    # Attach the user message's blockchain tx once the chain write lands
+    if user_msg_chain_task is not None:
+        try:
+            tx_hash = await user_msg_chain_task
+            await mongodb_manager.db.messages.update_one(
+                {"_id": message_docs[0]["_id"]},
+                {"$set": {"blockchain_tx_hash": tx_hash}}
+            )
+        except Exception as e:
+            logger.warning(f"Blockchain logging failed: {e}")
 
 # Return the full workflow result as a dict instead of structured response
 # Frontend expects: {intent, output, yoga_recommendations, yoga_videos, etc.}
@@ -949,101 +1385,91 @@ class ChatRequest(BaseModel):
 @app.post("/chat")
 async def chat(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
     req: Request = None
 ):
     """Process chat message with MongoDB storage, user profile, and history context"""
     try:
-        # Debug: Log the raw request body (using print for visibility)
-        print(f"🔍 [RAW REQUEST] ChatRequest object:")
-        print(f"   - query: {request.query[:50]}...")
-        print(f"   - session_id: {request.session_id}")
-        print(f"   - generate_audio: {request.generate_audio}")
-        print(f"   - locale: {request.locale}")
-        print(f"   - latitude: {request.latitude}")
-        print(f"   - longitude: {request.longitude}")
-        print(f"   - latitude type: {type(request.latitude)}")
-        print(f"   - longitude type: {type(request.longitude)}")
+        # Debug: Log the raw request body (formatted only when debug logging is on)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"🔍 [RAW REQUEST] ChatRequest: query={request.query[:50]!r} session_id={request.session_id} "
+                f"generate_audio={request.generate_audio} locale={request.locale} "
+                f"latitude={request.latitude!r} longitude={request.longitude!r}"
+            )
         
         user_id = current_user["_id"]
         user_salt = current_user["encryption_key_id"]
+        received_at = datetime.utcnow()  # one timestamp for the session + user message
+        
+        # The context reads only need ids the request already carries, so they are all
+        # started up front and run concurrently instead of one round trip after another
+        docs_fetch = asyncio.ensure_future(
+            mongodb_manager.db.user_documents.find(
+                {"user_id": user_id, "status": "processed"},
+                RECENT_DOCS_PROJECTION
+            ).sort(RECENT_DOCS_SORT).limit(RECENT_DOCS_LIMIT).to_list(length=RECENT_DOCS_LIMIT)
+        )
         
         # Get or create session
+        session_insert = None
+        history_fetch = None
         if request.session_id:
-            session = await mongodb_manager.db.sessions.find_one({"_id": ObjectId(request.session_id)})
-            if not session or session["user_id"] != user_id:
-                raise HTTPException(status_code=404, detail="Session not found")
+            session_oid = parse_object_id(request.session_id, "session_id")
+            history_fetch = asyncio.ensure_future(fetch_recent_history(session_oid))
+            ownership_key = (session_oid, user_id)
+            if ownership_key in _session_owner_cache:
+                # Follow-up message in a session we've already verified
+                session = {"_id": session_oid}
+            else:
+                # Ownership is part of the filter, so one lookup both finds and authorizes
+                session = await mongodb_manager.db.sessions.find_one(
+                    {"_id": session_oid, "user_id": user_id},
+                    SESSION_ID_PROJECTION
+                )
+                if not session:
+                    # Nothing fetched so far may be used for someone else's session
+                    history_fetch.cancel()
+                    docs_fetch.cancel()
+                    raise HTTPException(status_code=404, detail="Session not found")
+                _session_owner_cache[ownership_key] = True
         else:
-            # Create new session
+            # Create new session (id generated here, so nothing has to be read back)
             session_doc = {
+                "_id": ObjectId(),
                 "user_id": user_id,
                 "title": request.query[:50],
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
+                "created_at": received_at,
+                "updated_at": received_at,
                 "status": "active",
                 "blockchain_session_hash": None
             }
-            result = await mongodb_manager.db.sessions.insert_one(session_doc)
-            session = await mongodb_manager.db.sessions.find_one({"_id": result.inserted_id})
+            # The insert overlaps with the context building and workflow below; it is
+            # awaited before the response so the session exists once the client knows its id
+            session_insert = asyncio.ensure_future(mongodb_manager.db.sessions.insert_one(session_doc))
+            session = session_doc
+            _session_owner_cache[(session["_id"], user_id)] = True
         
         session_id = session["_id"]
         
         # --- USER PROFILE INTEGRATION WITH DISHA COMPLIANCE ---
         # Use current_user data directly (from users collection)
-        # Decrypt age
-        age = None
-        if current_user.get("age_encrypted") and user_salt:
-            decrypted_age = encryption_manager.decrypt(current_user["age_encrypted"], user_salt)
-            try:
-                age = int(decrypted_age)
-            except (ValueError, TypeError):
-                age = None
-        elif current_user.get("age"):
-            age = current_user.get("age")
-        
-        # Decrypt gender
-        gender = None
-        if current_user.get("gender_encrypted") and user_salt:
-            gender = encryption_manager.decrypt(current_user["gender_encrypted"], user_salt)
-        elif current_user.get("gender"):
-            gender = current_user.get("gender")
-        
-        user_profile_raw = {
-            "user_id": user_id,
-            "age": age,
-            "gender": gender,
-            "medical_history": "[]",
-            "allergies": "[]",
-            "medications": "[]",
-            "language_preference": "en"
-        }
-        
-        # Decrypt medical data if encrypted
-        if current_user.get("medical_history_encrypted") and user_salt:
-            decrypted = encryption_manager.decrypt(current_user["medical_history_encrypted"], user_salt)
-            user_profile_raw["medical_history"] = decrypted
-        
-        if current_user.get("medications_encrypted") and user_salt:
-            decrypted = encryption_manager.decrypt(current_user["medications_encrypted"], user_salt)
-            user_profile_raw["medications"] = decrypted
-        
-        if current_user.get("allergies_encrypted") and user_salt:
-            decrypted = encryption_manager.decrypt(current_user["allergies_encrypted"], user_salt)
-            user_profile_raw["allergies"] = decrypted
+        user_profile_raw, user_email = decrypt_chat_profile(current_user)
+        # What is stored now, so a profile update from the workflow only writes real changes
+        stored_profile = {field: user_profile_raw.get(field) for field in PROFILE_SYNC_FIELDS}
         
         # Fetch recent documents for context
         document_context = ""
         full_documents_text = ""  # For detailed document queries
         try:
-            recent_docs = await mongodb_manager.db.user_documents.find(
-                {"user_id": user_id, "status": "processed"}
-            ).sort("upload_date", -1).limit(5).to_list(length=5)
+            recent_docs = await docs_fetch
             
             logger.info(f"📄 Found {len(recent_docs)} processed documents for user")
             
             if recent_docs:
                 doc_summaries = []
-                doc_full_texts = []
+                encrypted_texts = []  # (file name, ciphertext) for one batched decrypt below
                 
                 for doc in recent_docs:
                     analysis = doc.get("analysis", {})
@@ -1057,13 +1483,19 @@ async def chat(
                             summary += f" | Diagnoses: {', '.join(analysis['diagnoses'][:3])}"
                         doc_summaries.append(summary)
                         
-                        # Decrypt full text for document queries
+                        # Full text for document queries
                         if doc.get("full_text_encrypted"):
-                            try:
-                                full_text = encryption_manager.decrypt(doc["full_text_encrypted"], user_salt)
-                                doc_full_texts.append(f"\n--- {doc['file_name']} ---\n{full_text[:2000]}")  # Limit to 2000 chars per doc
-                            except Exception as e:
-                                logger.error(f"Failed to decrypt document text: {e}")
+                            encrypted_texts.append((doc["file_name"], doc["full_text_encrypted"]))
+                
+                # Whole PDFs can be large - decrypt them together, off the event loop
+                full_texts = await asyncio.to_thread(
+                    encryption_manager.decrypt_many, [text for _, text in encrypted_texts], user_salt
+                ) if encrypted_texts else []
+                doc_full_texts = [
+                    f"\n--- {file_name} ---\n{full_text[:2000]}"  # Limit to 2000 chars per doc
+                    for (file_name, _), full_text in zip(encrypted_texts, full_texts)
+                    if full_text is not None
+                ]
                 
                 if doc_summaries:
                     document_context = "\n\nRecent Medical Documents:\n" + "\n".join(doc_summaries)
@@ -1079,7 +1511,6 @@ async def chat(
         user_profile_raw["full_documents_text"] = full_documents_text  # For detailed queries
         
         # Anonymize user data (DISHA compliance)
-        user_email = encryption_manager.decrypt(current_user.get("email_encrypted", ""), user_salt)
         compliance_data = await compliance_manager.process_user_data({
             **user_profile_raw,
             "email": user_email
@@ -1104,49 +1535,41 @@ User Profile (Anonymized ID: {anonymous_id}):
 """
         
         # --- CHAT HISTORY INTEGRATION ---
-        # Fetch last 5 messages from this session
-        history_msgs = await mongodb_manager.db.messages.find(
-            {"session_id": session_id}
-        ).sort("timestamp", 1).to_list(length=None)
+        # Last 5 messages from this session, back into chronological order
+        # (a session created by this request has none, so nothing was fetched)
+        history_msgs = await history_fetch if history_fetch is not None else []
+        history_msgs.reverse()
         
-        history_context = ""
-        if history_msgs:
-            history_context += "\n\nPrevious conversation:\n"
-            for i, msg in enumerate(history_msgs[-5:], 1):
-                role = msg.get("role", "unknown")
-                content = msg.get("content")
-                # Handle content that might be a dict
-                if isinstance(content, dict):
-                    content = content.get("output", str(content))
-                history_context += f"{i}. {role.capitalize()}: {content}\n"
+        history_lines = [
+            f"{i}. {msg.get('role', 'unknown').capitalize()}: {format_history_content(msg.get('content'))}"
+            for i, msg in enumerate(history_msgs, 1)
+        ]
+        history_context = "\n\nPrevious conversation:\n" + "\n".join(history_lines) + "\n" if history_lines else ""
         
         # Combine context
         full_context_query = f"{profile_context}\n{history_context}\nUser Query: {request.query}"
         
-        # Store user message (plain text)
+        # User message (plain text) - stored together with the assistant reply below
         user_msg_doc = {
             "session_id": session_id,
             "user_id": user_id,
             "role": "user",
             "content": request.query,
             "intent": None,
-            "timestamp": datetime.utcnow(),
+            "timestamp": received_at,
             "ip_address": req.client.host if req else "unknown",
             "blockchain_tx_hash": None
         }
-        await mongodb_manager.db.messages.insert_one(user_msg_doc)
         
-        # Log to blockchain (if enabled)
+        # Log to blockchain (if enabled) - runs alongside the workflow; the tx hash is
+        # attached to the stored user message once the chain write finishes
+        user_msg_chain_task = None
         if blockchain_logger and blockchain_logger.enabled:
-            try:
-                tx_hash = await blockchain_logger.log_action(
-                    user_id=str(user_id),
-                    action="USER_MESSAGE",
-                    data={"session_id": str(session_id), "message_preview": request.query[:20]}
-                )
-                user_msg_doc["blockchain_tx_hash"] = tx_hash
-            except Exception as e:
-                logger.warning(f"Blockchain logging failed: {e}")
+            user_msg_chain_task = asyncio.create_task(blockchain_logger.log_action(
+                user_id=str(user_id),
+                action="USER_MESSAGE",
+                data={"session_id": str(session_id), "message_preview": request.query[:20]}
+            ))
         
         # Process with healthcare workflow WITH CONTEXT
         # Determine response language - detect from actual user input text
@@ -1157,59 +1580,96 @@ User Profile (Anonymized ID: {anonymous_id}):
             # Count English/ASCII alphabetic characters
             english_count = sum(1 for char in text if char.isascii() and char.isalpha())
             
-            logger.info(f"📊 Language Analysis of '{text}':")
-            logger.info(f"   - Devanagari chars: {devanagari_count}")
-            logger.info(f"   - English chars: {english_count}")
-            logger.info(f"   - URL locale: {url_locale}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"📊 Language Analysis of '{text}': devanagari={devanagari_count} english={english_count} locale={url_locale}")
             
             # If user typed Hindi characters, respond in Hindi
             if devanagari_count >= 3:
-                logger.info(f"   → Decision: HINDI (has {devanagari_count} Devanagari chars)")
+                logger.debug(f"   → Decision: HINDI (has {devanagari_count} Devanagari chars)")
                 return "Hindi (Devanagari script, not Urdu)"
             # If user typed English, respond in English
             elif english_count > devanagari_count:
-                logger.info(f"   → Decision: ENGLISH (has {english_count} English chars)")
+                logger.debug(f"   → Decision: ENGLISH (has {english_count} English chars)")
                 return "English"
             # If ambiguous (no clear text), use URL locale as fallback
             else:
                 fallback = "Hindi (Devanagari script, not Urdu)" if url_locale == "hi" else "English"
-                logger.info(f"   → Decision: FALLBACK to {fallback}")
+                logger.debug(f"   → Decision: FALLBACK to {fallback}")
                 return fallback
         
         response_language = detect_language_from_text(request.query, request.locale)
         logger.info(f"🔤 FINAL Response Language: {response_language}")
         
         # Debug logging for location
-        logger.info(f"🔍 [BACKEND STEP 1] Request received:")
-        logger.info(f"   - request.latitude: {request.latitude} (type: {type(request.latitude).__name__})")
-        logger.info(f"   - request.longitude: {request.longitude} (type: {type(request.longitude).__name__})")
-        logger.info(f"   - locale: {request.locale}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"🔍 [BACKEND STEP 1] Request received: latitude={request.latitude!r} "
+                f"longitude={request.longitude!r} locale={request.locale}"
+            )
         
         user_location_tuple = None
         if request.latitude and request.longitude:
             user_location_tuple = (request.latitude, request.longitude)
-            logger.info(f"✅ [BACKEND STEP 2] Created user_location tuple: {user_location_tuple}")
+            logger.info("✅ [BACKEND STEP 2] Created user_location tuple: %s", user_location_tuple)
         else:
-            logger.warning(f"⚠️ [BACKEND STEP 2] No location - latitude or longitude missing")
-        
-        logger.info(f"🚀 [BACKEND STEP 3] Calling workflow.run with user_location={user_location_tuple}")
-        
-        result = await workflow.run(
-            user_input=request.query,
-            query_for_classification=full_context_query,  # Pass full context
-            user_profile=user_profile_raw,  # Pass profile for potential updates
-            conversation_history=history_context,  # Pass conversation history
-            user_location=user_location_tuple,
-            response_language=response_language  # Tell workflow what language to respond in
-        )
-        
-        logger.info(f"📊 [BACKEND STEP 4] Workflow result keys: {list(result.keys())}")
-        logger.info(f"   - Has 'nearby_hospitals': {'nearby_hospitals' in result}")
-        if 'nearby_hospitals' in result:
-            logger.info(f"   - nearby_hospitals type: {type(result['nearby_hospitals'])}")
-            logger.info(f"   - nearby_hospitals length: {len(result['nearby_hospitals']) if result['nearby_hospitals'] else 0}")
-            if result['nearby_hospitals']:
-                logger.info(f"   - First hospital: {result['nearby_hospitals'][0]}")
+            logger.warning("⚠️ [BACKEND STEP 2] No location - latitude or longitude missing")
+        
+        logger.info("🚀 [BACKEND STEP 3] Calling workflow.run with user_location=%s", user_location_tuple)
+        
+        # Response cache lookup - scoped to this user's exact profile. Follow-up turns depend on
+        # the conversation so far, so only turns without history (and without a location) are cached.
+        cacheable = user_location_tuple is None and not history_context
+        result = None
+        query_vector = None
+        if cacheable:
+            cache_scope = hashlib.sha256(
+                f"{user_id}|{response_language}|{profile_context}".encode("utf-8")
+            ).hexdigest()
+            exact_key = ExactCache.make_key(cache_scope, request.query)
+            result = exact_response_cache.get(exact_key)
+            # Only embed up front when the semantic layer could actually hit
+            if result is None and response_cache.has_candidates(cache_scope):
+                try:
+                    query_vector = await response_cache.embed(request.query)
+                    result = response_cache.get(cache_scope, query_vector)
+                except Exception as e:
+                    logger.warning(f"⚠️ Semantic cache lookup failed: {e}")
+        
+        if result is None:
+            result = await workflow.run(
+                user_input=request.query,
+                query_for_classification=full_context_query,  # Pass full context
+                user_profile=user_profile_raw,  # Pass profile for potential updates
+                conversation_history=history_context,  # Pass conversation history
+                user_location=user_location_tuple,
+                response_language=response_language  # Tell workflow what language to respond in
+            )
+            
+            # Only cache plain answers (no emergencies, blocks or profile side effects)
+            if (cacheable and result.get("intent") != "emergency"
+                    and result.get("status") != "blocked" and not result.get("profile_updated")):
+                semantic = result.get("intent") in SEMANTIC_CACHE_INTENTS and not result.get("is_multi_domain")
+                # Clinical answers are only replayed for a short retry window
+                exact_response_cache.put(exact_key, result, ttl_seconds=None if semantic else CLINICAL_EXACT_CACHE_TTL)
+                if semantic:
+                    # Embedding (if the lookup didn't already) and the put happen after the response
+                    task = asyncio.create_task(
+                        semantic_cache_put(cache_scope, request.query, query_vector, copy.deepcopy(result))
+                    )
+                    _cache_put_tasks.add(task)
+                    task.add_done_callback(_cache_put_tasks.discard)
+        else:
+            logger.info("⚡ Served from response cache (exact: %s, semantic: %s)", exact_response_cache.stats(), response_cache.stats())
+        
+        # Result summary (only built when INFO logging is on)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("📊 [BACKEND STEP 4] Workflow result keys: %s", list(result.keys()))
+            logger.info("   - Has 'nearby_hospitals': %s", 'nearby_hospitals' in result)
+            if 'nearby_hospitals' in result:
+                logger.info("   - nearby_hospitals type: %s", type(result['nearby_hospitals']))
+                logger.info("   - nearby_hospitals length: %d", len(result['nearby_hospitals']) if result['nearby_hospitals'] else 0)
+                if result['nearby_hospitals']:
+                    logger.info("   - First hospital: %s", result['nearby_hospitals'][0])
         
         # Process response with DISHA compliance
         try:
@@ -1234,115 +1694,52 @@ User Profile (Anonymized ID: {anonymous_id}):
         
         # Check if workflow updated the profile
         if result.get("profile_updated"):
-            # Encrypt updated data before storing in users collection
-            update_fields = {}
-            
-            if user_profile_raw.get("age"):
-                encrypted_age = encryption_manager.encrypt(str(user_profile_raw["age"]), user_salt)
-                update_fields["age_encrypted"] = encrypted_age
-            
-            if user_profile_raw.get("gender"):
-                encrypted_gender = encryption_manager.encrypt(user_profile_raw["gender"], user_salt)
-                update_fields["gender_encrypted"] = encrypted_gender
-            
-            if user_profile_raw.get("medical_history"):
-                encrypted_history = encryption_manager.encrypt(user_profile_raw["medical_history"], user_salt)
-                update_fields["medical_history_encrypted"] = encrypted_history
-            
-            if user_profile_raw.get("medications"):
-                encrypted_meds = encryption_manager.encrypt(user_profile_raw["medications"], user_salt)
-                update_fields["medications_encrypted"] = encrypted_meds
+            # Encrypt only the fields that actually changed - re-encrypting unchanged
+            # values would cost a write and a fresh ciphertext for nothing
+            update_fields = {
+                f"{field}_encrypted": encryption_manager.encrypt(str(user_profile_raw[field]), user_salt)
+                for field in PROFILE_SYNC_FIELDS
+                if user_profile_raw.get(field) and user_profile_raw[field] != stored_profile[field]
+            }
             
             if update_fields:
                 await mongodb_manager.db.users.update_one(
                     {"_id": user_id},
                     {"$set": update_fields}
                 )
+                invalidate_user_cache(user_id)
+                invalidate_chat_profile(user_id)
                 logger.info(f"Updated user profile for {user_id}")
         
         # --- TTS AUDIO GENERATION (if requested) ---
-        audio_url = None
+        # Synthesis runs in the background; the text response doesn't wait for it.
+        # The audio URL is final - a GET for it waits until the file is written.
+        audio_url, audio_ready = None, False
         if request.generate_audio:
-            from openai import OpenAI
-            import hashlib
-            import re
-            
-            # Use primary OpenAI key for TTS
-            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY_1"))
-            
-            # Get text to speak
-            raw_output = result.get("output") if isinstance(result, dict) else result
-            tts_input = raw_output if isinstance(raw_output, str) else str(raw_output)
-            
-            # Clean text for TTS (but keep in displayed text)
-            # Remove citations
-            tts_input = re.sub(r'\[Source:.*?\]', '', tts_input)
-            tts_input = re.sub(r'\[\d+\]', '', tts_input)
-            tts_input = re.sub(r'\[Citation:.*?\]', '', tts_input)
-            
-            # Remove markdown formatting
-            tts_input = re.sub(r'#{1,6}\s*', '', tts_input)  # Headers (###)
-            tts_input = re.sub(r'\*\*(.*?)\*\*', r'\1', tts_input)  # Bold
-            tts_input = re.sub(r'\*(.*?)\*', r'\1', tts_input)  # Italic
-            tts_input = re.sub(r'`(.*?)`', r'\1', tts_input)  # Inline code
-            tts_input = re.sub(r'^\s*[-*+]\s+', '', tts_input, flags=re.MULTILINE)  # List markers
-            tts_input = re.sub(r'^\s*\d+\.\s+', '', tts_input, flags=re.MULTILINE)  # Numbered lists
-            
-            # Remove emojis (all Unicode emoji characters)
-            tts_input = re.sub(r'[^\w\s,.!?;:()\-\'/"]', '', tts_input)
-            
-            # Clean up multiple spaces and newlines
-            tts_input = re.sub(r'\n+', '. ', tts_input)  # Replace newlines with periods
-            tts_input = re.sub(r'\s+', ' ', tts_input).strip()
-            
-            # Create cache filename
-            text_hash = hashlib.md5(tts_input.encode("utf-8")).hexdigest()
-            filename = f"{text_hash}.mp3"
-            tts_path = os.path.join(AUDIO_DIR, filename)
-            
-            # Generate if not cached
-            if not os.path.exists(tts_path):
-                logger.info(f"Generating TTS for session {session_id}")
-                try:
-                    speech = client.audio.speech.create(
-                        model="tts-1",
-                        voice="alloy",
-                        input=tts_input[:4096],
-                        response_format="mp3"
-                    )
-                    with open(tts_path, "wb") as f:
-                        f.write(speech.read())
-                    logger.info(f"TTS generated: {filename}")
-                except Exception as e:
-                    logger.error(f"TTS generation failed: {e}")
-            else:
-                logger.info(f"TTS cache hit: {filename}")
-            
-            base_url = os.getenv("FRONTEND_BASE_URL", "http://127.0.0.1:8000")
-            audio_url = f"{base_url}/audio/{filename}"
+            audio_url, audio_ready = await start_chat_audio(result, session_id)
         
         # Store assistant response
         assistant_content = str(result.get("output", ""))
         if not assistant_content:
             assistant_content = str(result)
         
+        # Reply gets its own timestamp so history keeps user -> assistant order
+        replied_at = datetime.utcnow()
         assistant_msg_doc = {
             "session_id": session_id,
             "user_id": user_id,
             "role": "assistant",
             "content": assistant_content,
             "intent": result.get("intent"),
-            "timestamp": datetime.utcnow(),
+            "timestamp": replied_at,
             "ip_address": req.client.host if req else "unknown",
             "blockchain_tx_hash": None
         }
-        await mongodb_manager.db.messages.insert_one(assistant_msg_doc)
+        if session_insert is not None:
+            await session_insert
         
-        # Update session timestamp
-        await mongodb_manager.db.sessions.update_one(
-            {"_id": session_id},
-            {"$set": {"updated_at": datetime.utcnow()}}
-        )
+        # Both sides of the turn + session timestamp are written after the response is sent
+        background_tasks.add_task(persist_chat_turn, session_id, [user_msg_doc, assistant_msg_doc], user_msg_chain_task)
         
         # Audit log
         await log_audit(
@@ -1357,8 +1754,9 @@ User Profile (Anonymized ID: {anonymous_id}):
         response_data = {
             **result,
             "session_id": str(session_id),
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": replied_at.isoformat(),
             "audio_url": audio_url,
+            "audio_ready": audio_ready,
             "compliance": {
                 "status": "DISHA_COMPLIANT",
                 "anonymized": True,
@@ -1380,32 +1778,103 @@ User Profile (Anonymized ID: {anonymous_id}):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Comment lines sent while the workflow runs so proxies (ngrok, nginx) don't drop idle streams
+SSE_KEEPALIVE_SECONDS = 10
+
+def sse_event(event: str, payload) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(jsonable_encoder(payload)).decode()}\n\n"
+
+_chat_stream_jobs: set = set()
+
+@app.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    current_user: dict = Depends(get_current_user),
+    req: Request = None
+):
+    """
+    /chat over Server-Sent Events: headers go out immediately, keep-alives flow while the
+    workflow runs, then a single `result` (or `error`) event carries the /chat payload.
+    The workflow produces a structured result (intent, citations, videos, hospitals), not a
+    token stream, so the answer itself is sent once complete.
+    """
+    async def run_turn():
+        turn_tasks = BackgroundTasks()
+        result = await chat(request, turn_tasks, current_user, req)
+        # Persist the turn on its own, not via the response - it must run even if
+        # the client disconnected before the result event
+        job = asyncio.create_task(turn_tasks())
+        _chat_stream_jobs.add(job)
+        job.add_done_callback(_chat_stream_jobs.discard)
+        return result
+    
+    # Runs independently of the connection - a client that goes away doesn't lose the turn
+    chat_task = asyncio.create_task(run_turn())
+    _chat_stream_jobs.add(chat_task)
+    chat_task.add_done_callback(_chat_stream_jobs.discard)
+    
+    async def events():
+        yield ": accepted\n\n"
+        while not chat_task.done():
+            done, _ = await asyncio.wait({chat_task}, timeout=SSE_KEEPALIVE_SECONDS)
+            if not done:
+                yield ": keep-alive\n\n"
+        try:
+            yield sse_event("result", chat_task.result())
+        except HTTPException as e:
+            yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}", exc_info=True)
+            yield sse_event("error", {"status_code": 500, "detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Formatted /alerts payload - every widget poll within the TTL shares one result
+_alerts_cache = TTLCache(maxsize=1, ttl=60)
+_alerts_lock = asyncio.Lock()
 
 @app.get("/alerts")
 async def get_health_alerts():
     """Get real-time health alerts to display in the frontend widget"""
-    try:
-        # Access the advisory chain from the workflow
-        if hasattr(workflow, 'advisory_chain'):
-             # Run in thread pool to avoid blocking async loop since requests is sync
+    cached = _alerts_cache.get("alerts")
+    if cached is not None:
+        return cached
+    
+    # One refresh at a time; requests that queued behind it reuse its result
+    async with _alerts_lock:
+        cached = _alerts_cache.get("alerts")
+        if cached is not None:
+            return cached
+        
+        try:
+            # Access the advisory chain from the workflow
+            if not hasattr(workflow, 'advisory_chain'):
+                return {"alerts": []}
+            
+            # Run in thread pool to avoid blocking async loop since requests is sync
             articles = await asyncio.to_thread(workflow.advisory_chain.fetch_headlines)
             
             # Format for frontend
-            alerts = []
-            for a in articles:
-                alerts.append({
+            alerts = [
+                {
                     "title": a.get("title"),
                     "url": a.get("url", "#"),
                     "source": a.get("source", {}).get("name", "Unknown"),
                     "publishedAt": a.get("publishedAt"),
                     "description": a.get("description", "")
-                })
+                }
+                for a in articles
+            ]
+            _alerts_cache["alerts"] = {"alerts": alerts}
             return {"alerts": alerts}
-        else:
+        except Exception as e:
+            logger.error(f"Alerts fetch error: {e}", exc_info=True)
             return {"alerts": []}
-    except Exception as e:
-        logger.error(f"Alerts fetch error: {e}", exc_info=True)
-        return {"alerts": []}
 
 
 @app.get("/sessions")
@@ -1415,20 +1884,17 @@ async def get_sessions(current_user: dict = Depends(get_current_user)):
         user_id = current_user["_id"]
         user_salt = current_user["encryption_key_id"]
         
-        cursor = mongodb_manager.db.sessions.find(
-            {"user_id": user_id, "status": "active"}
-        ).sort("updated_at", -1).limit(50)
-        
-        sessions = []
-        async for session in cursor:
-            sessions.append({
-                "id": str(session["_id"]),
-                "title": session.get("title", "Untitled"),
-                "created_at": session["created_at"].isoformat(),
-                "updated_at": session["updated_at"].isoformat()
-            })
+        # MongoDB returns rows already in the response shape (string id, default title)
+        sessions = await mongodb_manager.db.sessions.aggregate([
+            {"$match": {"user_id": user_id, "status": "active"}},
+            {"$sort": {"updated_at": -1}},
+            {"$limit": 50},
+            {"$project": SESSION_LIST_PROJECTION},
+        ]).to_list(length=50)
         
-        return {"sessions": sessions}
+        # Plain str/datetime values - hand them straight to orjson (native ISO datetimes)
+        # instead of a jsonable_encoder pass over every document
+        return ORJSONResponse({"sessions": sessions})
         
     except Exception as e:
         logger.error(f"Get sessions error: {e}", exc_info=True)
@@ -1446,27 +1912,34 @@ async def get_session_messages(
         user_id = current_user["_id"]
         user_salt = current_user["encryption_key_id"]
         
-        # Verify session ownership
-        session = await mongodb_manager.db.sessions.find_one({"_id": ObjectId(session_id)})
-        if not session or session["user_id"] != user_id:
-            raise HTTPException(status_code=404, detail="Session not found")
+        session_oid = parse_object_id(session_id, "session_id")
         
-        # Get messages
-        cursor = mongodb_manager.db.messages.find(
-            {"session_id": ObjectId(session_id)}
-        ).sort("timestamp", 1)
+        # Messages carry their owner's user_id, so the filter itself enforces ownership -
+        # one round trip instead of a session lookup followed by the messages fetch
+        message_docs = await mongodb_manager.db.messages.find(
+            {"session_id": session_oid, "user_id": user_id},
+            MESSAGE_LIST_PROJECTION
+        ).sort("timestamp", 1).to_list(length=None)
         
-        messages = []
-        async for msg in cursor:
-            content = msg.get("content", "")
-            
-            messages.append({
+        # Nothing matched: tell an empty (e.g. just created) session apart from one that isn't ours
+        if not message_docs and (session_oid, user_id) not in _session_owner_cache:
+            session = await mongodb_manager.db.sessions.find_one(
+                {"_id": session_oid, "user_id": user_id},
+                SESSION_ID_PROJECTION
+            )
+            if not session:
+                raise HTTPException(status_code=404, detail="Session not found")
+        
+        messages = [
+            {
                 "role": msg["role"],
-                "content": content,
-                "timestamp": msg["timestamp"].isoformat()
-            })
+                "content": msg.get("content", ""),
+                "timestamp": msg["timestamp"]
+            }
+            for msg in message_docs
+        ]
         
-        return {"messages": messages}
+        return ORJSONResponse({"messages": messages})
         
     except HTTPException:
         raise
@@ -1483,17 +1956,17 @@ async def delete_session(
     """Archive a session"""
     try:
         user_id = current_user["_id"]
-        
-        # Verify session ownership
-        session = await mongodb_manager.db.sessions.find_one({"_id": ObjectId(session_id)})
-        if not session or session["user_id"] != user_id:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        # Archive instead of delete (HIPAA compliance)
-        await mongodb_manager.db.sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {"$set": {"status": "archived", "updated_at": datetime.utcnow()}}
+        session_oid = parse_object_id(session_id, "session_id")
+        
+        # Archive instead of delete (HIPAA compliance). Ownership is part of the filter,
+        # so finding, authorizing and archiving are one atomic round trip
+        session = await mongodb_manager.db.sessions.find_one_and_update(
+            {"_id": session_oid, "user_id": user_id},
+            {"$set": {"status": "archived", "updated_at": datetime.utcnow()}},
+            projection=SESSION_ID_PROJECTION
         )
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
         
         return {"message": "Session archived successfully"}
         
@@ -1504,50 +1977,6 @@ async def delete_session(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# ==================== AUDIO ENDPOINTS ====================
-
-@app.post("/transcribe")
-async def transcribe_audio(
-    file: UploadFile,
-    current_user: dict = Depends(get_current_user)
-):
-    """Transcribe uploaded audio file using Whisper"""
-    import tempfile
-    from openai import OpenAI
-    
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    
-    try:
-        # Save uploaded audio temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp:
-            tmp.write(await file.read())
-            audio_path = tmp.name
-
-        # Whisper transcription
-        with open(audio_path, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json"
-            )
-
-        text = transcription.text.strip()
-        language = getattr(transcription, "language", "en")
-        
-        logger.info(f"Transcription ({language}): {text}")
-
-        # Cleanup
-        os.unlink(audio_path)
-        
-        return {"text": text, "language": language}
-    
-    except Exception as e:
-        logger.error(f"Transcription error: {e}", exc_info=True)
-        if os.path.exists(audio_path):
-            os.unlink(audio_path)
-        raise HTTPException(status_code=500, detail=str(e))
-
-
 # ==================== DOCUMENT UPLOAD ENDPOINTS ====================
 
 @app.post("/documents/upload")
@@ -1556,8 +1985,6 @@ async def upload_medical_document(
     current_user: dict = Depends(get_current_user)
 ):
     """Upload and extract medical document (PDF)"""
-    import tempfile
-    from pathlib import Path
     from src.document_processor.pdf_extractor import MedicalDocumentExtractor
     
     # Validate file type
@@ -1571,15 +1998,20 @@ async def upload_medical_document(
         user_id = current_user["_id"]
         user_salt = current_user["encryption_key_id"]
         
-        # Save uploaded file temporarily
+        # Save uploaded file temporarily, streaming it in chunks (disk writes off the event loop)
+        file_size = 0
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            content = await file.read()
-            tmp.write(content)
             tmp_path = Path(tmp.name)
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                await asyncio.to_thread(tmp.write, chunk)
+                file_size += len(chunk)
         
-        # Extract and analyze
-        extractor = MedicalDocumentExtractor(llm=config.llm_secondary)
-        result = extractor.process_medical_pdf(tmp_path)
+        # Extract and analyze (temp file is removed even if extraction fails)
+        try:
+            extractor = MedicalDocumentExtractor(llm=config.llm_secondary)
+            result = extractor.process_medical_pdf(tmp_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
         
         # Determine status - always "processed" if text was extracted
         # Analysis can fail but document is still uploaded
@@ -1593,7 +2025,7 @@ async def upload_medical_document(
         document_doc = {
             "user_id": user_id,
             "file_name": file.filename,
-            "file_size": len(content),
+            "file_size": file_size,
             "upload_date": datetime.utcnow(),
             "extraction": {
                 "num_pages": result.get("num_pages"),
@@ -1612,9 +2044,6 @@ async def upload_medical_document(
         insert_result = await mongodb_manager.db.user_documents.insert_one(document_doc)
         document_id = str(insert_result.inserted_id)
         
-        # Cleanup temp file
-        os.unlink(tmp_path)
-        
         # Build user-friendly message
         message = "Document uploaded successfully"
         if result.get("analysis", {}).get("error"):
@@ -1646,7 +2075,6 @@ async def upload_medical_document(
                 ownership_status = "confirmed_user"
                 # Update user profile with document data
                 try:
-                    import json
                     update_fields = {}
                     
                     # Add new medications
@@ -1687,6 +2115,7 @@ async def upload_medical_document(
                             {"_id": user_id},
                             {"$set": update_fields}
                         )
+                        invalidate_user_cache(user_id)
                         profile_updated = True
                         logger.info(f"✅ Profile updated from document for user {user_id}")
                         message += " | Profile updated with medications and diagnoses"
@@ -1757,7 +2186,7 @@ async def delete_document(
         user_id = current_user["_id"]
         
         result = await mongodb_manager.db.user_documents.delete_one({
-            "_id": ObjectId(document_id),
+            "_id": parse_object_id(document_id, "document_id"),
             "user_id": user_id
         })
         
@@ -1767,30 +2196,13 @@ async def delete_document(
         logger.info(f"🗑️ Document deleted: {document_id}")
         return {"success": True, "message": "Document deleted"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting document: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# -------------------------------------------------------
-# TTS AUDIO ENDPOINT
-# -------------------------------------------------------
-@app.get("/audio/{filename}")
-async def serve_audio(filename: str):
-    """Serve generated TTS audio files"""
-    from fastapi.responses import FileResponse
-    
-    file_path = os.path.join(AUDIO_DIR, filename)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Audio file not found")
-    
-    return FileResponse(
-        file_path,
-        media_type="audio/mpeg",
-        headers={"Cache-Control": "public, max-age=3600"}
-    )
-
-
 # -------------------------------------------------------
 # DISHA COMPLIANCE ENDPOINTS
 # -------------------------------------------------------
@@ -1811,6 +2223,29 @@ async def verify_response_signature(signature: str, response_data: str):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def decrypt_user_email(user: dict) -> str:
+    """Decrypt only the email field (no need to touch the rest of the user's PHI)"""
+    if user.get("email"):
+        return user["email"]
+    return encryption_manager.decrypt(user.get("email_encrypted", ""), user.get("encryption_key_id"))
+
+
+async def get_user_anonymous_id(user: dict) -> str:
+    """
+    The user's anonymous ID (a pure function of their email), stored on the user document
+    at signup/login. Accounts that haven't logged in since get it derived once and written back
+    """
+    anonymous_id = user.get("anonymous_id")
+    if anonymous_id:
+        return anonymous_id
+    
+    user_email = decrypt_user_email(user)
+    anonymous_id = compliance_manager.anonymizer.create_anonymous_id(user_email)
+    await mongodb_manager.db.users.update_one({"_id": user["_id"]}, {"$set": {"anonymous_id": anonymous_id}})
+    invalidate_user_cache(user["_id"])
+    return anonymous_id
+
+
 @app.get("/compliance/audit/{anonymous_id}")
 async def get_audit_trail(
     anonymous_id: str,
@@ -1821,12 +2256,8 @@ async def get_audit_trail(
     User can only access their own audit trail
     """
     try:
-        user_id = current_user["_id"]
-        user_salt = current_user["encryption_key_id"]
-        user_email = encryption_manager.decrypt(current_user.get("email_encrypted", ""), user_salt)
-        
         # Verify user owns this anonymous ID
-        user_anon_id = compliance_manager.anonymizer.create_anonymous_id(user_email)
+        user_anon_id = await get_user_anonymous_id(current_user)
         
         if user_anon_id != anonymous_id:
             raise HTTPException(status_code=403, detail="Access denied - not your audit trail")
@@ -1834,7 +2265,7 @@ async def get_audit_trail(
         # Fetch audit trail directly from blockchain
         if not blockchain_logger:
             raise HTTPException(status_code=503, detail="Blockchain service unavailable")
-        audit_trail = blockchain_logger.blockchain.get_audit_trail(anonymous_id)
+        audit_trail = await blockchain_logger.aget_audit_trail(anonymous_id)
         
         return {
             "anonymous_id": anonymous_id,
@@ -1855,11 +2286,8 @@ async def get_anonymous_id(current_user: dict = Depends(get_current_user)):
     Get the authenticated user's anonymous ID for blockchain queries
     """
     try:
-        user_salt = current_user["encryption_key_id"]
-        user_email = encryption_manager.decrypt(current_user.get("email_encrypted", ""), user_salt)
-        
-        # Generate anonymous ID using compliance manager
-        anonymous_id = compliance_manager.anonymizer.create_anonymous_id(user_email)
+        anonymous_id = await get_user_anonymous_id(current_user)
+        user_email = decrypt_user_email(current_user)
         
         return {
             "anonymous_id": anonymous_id,
@@ -1877,7 +2305,7 @@ async def get_blockchain_statistics():
     try:
         if not blockchain_logger:
             raise HTTPException(status_code=503, detail="Blockchain service unavailable")
-        stats = blockchain_logger.get_statistics()
+        stats = await blockchain_logger.aget_statistics()
         
         return {
             "blockchain_type": "Private SQLite Blockchain",
@@ -1893,3 +2321,16 @@ async def get_blockchain_statistics():
     except Exception as e:
         logger.error(f"Stats error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Single process by default (each worker loads its own embedding/reranker models);
+    # set WEB_CONCURRENCY for more. See README for the gunicorn production command
+    uvicorn.run(
+        "api_mongodb:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
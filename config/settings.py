@@ -26,6 +26,7 @@ class Settings(BaseSettings):
     )
     EMBEDDING_DIMENSION: int = 384  # For all-MiniLM-L6-v2
     BATCH_SIZE: int = 32
+    EMBEDDING_MICROBATCH: bool = True  # Coalesce concurrent query embeddings into one call
     
     # Vector Store Configuration
     VECTOR_STORE_TYPE: str = Field(
@@ -1,5 +1,11 @@
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from cachetools import TTLCache
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
@@ -10,8 +16,39 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Verified against when the account doesn't exist, so unknown emails cost the same bcrypt time
+DUMMY_PASSWORD_HASH = pwd_context.hash(os.urandom(16).hex())
+
+# Recent successful verifications: (stored hash, sha256 of attempt) -> True
+# Short TTL bounds how long a cached credential stays valid without the KDF
+_verified_cache = TTLCache(maxsize=1000, ttl=60)
+_verified_lock = threading.Lock()
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    key = (hashed_password, hashlib.sha256(plain_password.encode("utf-8")).hexdigest())
+    with _verified_lock:
+        if key in _verified_cache:
+            return True
+    valid = pwd_context.verify(plain_password, hashed_password)
+    if valid:
+        # Only successes are cached so failed guesses can't flood the cache
+        with _verified_lock:
+            _verified_cache[key] = True
+    return valid
+
+# bcrypt is CPU-bound: a dedicated pool sized to the cores bounds login/signup bursts
+# without eating the default executor that the rest of the app uses for I/O offloading
+_kdf_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt")
+
+async def verify_password_async(plain_password, hashed_password):
+    """verify_password without blocking the event loop on bcrypt"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_kdf_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """get_password_hash without blocking the event loop on bcrypt"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_kdf_executor, get_password_hash, password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
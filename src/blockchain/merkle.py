@@ -0,0 +1,60 @@
+"""
+Merkle tree helpers for batched audit blocks
+One block commits to a whole batch via the root; each entry keeps its own inclusion proof
+
+Odd levels duplicate their last node, so [a, b, c] and [a, b, c, c] share a root -
+blocks record their leaf_count and verifiers must check it against the stored entries.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List
+
+
+def leaf_hash(record: Dict[str, Any]) -> str:
+    """SHA-256 of a whole audit record's canonical JSON (every field is committed to)"""
+    return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _hash_pair(left: str, right: str) -> str:
+    return hashlib.sha256(bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _next_level(level: List[str]) -> List[str]:
+    # Odd levels pair the last node with itself
+    if len(level) % 2:
+        level = level + [level[-1]]
+    return [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+
+
+def merkle_tree(leaves: List[str]) -> List[List[str]]:
+    """All levels of the tree over hex SHA-256 leaves, leaves first and root last"""
+    if not leaves:
+        raise ValueError("Merkle tree needs at least one leaf")
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        levels.append(_next_level(levels[-1]))
+    return levels
+
+
+def merkle_proof(levels: List[List[str]], index: int) -> List[Dict[str, str]]:
+    """Sibling hashes from leaf `index` up to the root"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling >= len(level):
+            sibling = index
+        proof.append({"position": "left" if sibling < index else "right", "hash": level[sibling]})
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(leaf: str, proof: List[Dict[str, str]], root: str) -> bool:
+    """Recompute the root from a leaf and its proof"""
+    node = leaf
+    for step in proof:
+        if step["position"] == "left":
+            node = _hash_pair(step["hash"], node)
+        else:
+            node = _hash_pair(node, step["hash"])
+    return node == root
@@ -3,17 +3,25 @@ Cloud PostgreSQL Blockchain Implementation
 Shared blockchain across multiple developers/environments
 """
 
+import asyncio
+import threading
 import psycopg2
 from psycopg2.extras import RealDictCursor, Json
 import hashlib
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 import os
 
+from src.blockchain.merkle import leaf_hash, merkle_tree, merkle_proof
+from src.blockchain.read_cache import ChainReadCache
+
 logger = logging.getLogger(__name__)
 
+# pg_advisory_xact_lock key shared by every process/host appending to this chain
+CHAIN_APPEND_LOCK_KEY = 0x5072616E  # "Pran"
+
 
 class PostgresBlockchain:
     """
@@ -28,6 +36,16 @@ class PostgresBlockchain:
         if not self.connection_url:
             raise ValueError("BLOCKCHAIN_DATABASE_URL not set")
         
+        # Appends read the chain tip and then insert. Across processes and hosts they are
+        # serialized by a Postgres advisory lock (see _lock_chain_tip); this lock just queues
+        # this process's threads so they don't each hold a connection while waiting
+        self._append_lock = threading.Lock()
+        
+        # Persistent autocommit connection for tip lookups - the read cache checks the tip
+        # on every read, which shouldn't cost a connection (TLS) setup each time
+        self._tip_conn = None
+        self._tip_lock = threading.Lock()
+        
         # Add connection timeout and retry logic
         import time
         max_retries = 3
@@ -61,6 +79,11 @@ class PostgresBlockchain:
             logger.error(f"Failed to connect to PostgreSQL: {e}")
             raise
     
+    @staticmethod
+    def _lock_chain_tip(cursor) -> None:
+        """Take the chain's append lock for the current transaction (released on commit/rollback)"""
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', (CHAIN_APPEND_LOCK_KEY,))
+    
     def _init_database(self):
         """Initialize blockchain tables"""
         conn = self._get_connection()
@@ -137,9 +160,14 @@ class PostgresBlockchain:
         """Mine a new block (Proof of Work)"""
         nonce = 0
         target = "0" * difficulty
+        # The nonce is the last field hashed - hash the fixed prefix once and
+        # only feed the nonce per attempt (same digest as _calculate_hash)
+        prefix = hashlib.sha256(f"{block_number}{timestamp}{previous_hash}{data}".encode())
         
         while True:
-            block_hash = self._calculate_hash(block_number, timestamp, previous_hash, data, nonce)
+            attempt = prefix.copy()
+            attempt.update(str(nonce).encode())
+            block_hash = attempt.hexdigest()
             if block_hash.startswith(target):
                 return block_hash, nonce
             nonce += 1
@@ -149,6 +177,10 @@ class PostgresBlockchain:
     
     def log_audit(self, anonymous_id: str, action: str, metadata: Dict[str, Any] = None) -> Optional[Dict]:
         """Log an audit event to the blockchain"""
+        with self._append_lock:
+            return self._append_audit_block(anonymous_id, action, metadata)
+    
+    def _append_audit_block(self, anonymous_id: str, action: str, metadata: Dict[str, Any] = None) -> Optional[Dict]:
         conn = None  # Initialize to None to avoid UnboundLocalError in exception handler
         try:
             # Fix: action might be a dict, convert to string
@@ -170,8 +202,9 @@ class PostgresBlockchain:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             logger.info(f"   ✓ Connected")
             
-            # Get last block
+            # Get last block (under the append lock, so no other writer can extend the same tip)
             logger.info(f"📦 Fetching last block...")
+            self._lock_chain_tip(cursor)
             cursor.execute('SELECT * FROM blocks ORDER BY block_number DESC LIMIT 1')
             last_block = cursor.fetchone()
             
@@ -248,6 +281,118 @@ class PostgresBlockchain:
                 conn.close()
             return None
     
+    def log_audit_batch(self, entries: List[Tuple[str, str, Dict[str, Any]]]) -> Optional[Dict]:
+        """Log several (anonymous_id, action, metadata) audit events under one Merkle-rooted block"""
+        with self._append_lock:
+            return self._append_audit_batch_block(entries)
+    
+    def _append_audit_batch_block(self, entries: List[Tuple[str, str, Dict[str, Any]]]) -> Optional[Dict]:
+        if not entries:
+            return None
+        
+        conn = None
+        try:
+            timestamp_obj = datetime.now()
+            timestamp = timestamp_obj.isoformat()
+            
+            rows = []
+            for anonymous_id, action, metadata in entries:
+                if isinstance(action, dict):
+                    action = json.dumps(action)
+                data_hash = leaf_hash({
+                    "anonymous_id": anonymous_id,
+                    "action": action,
+                    "timestamp": timestamp,
+                    "metadata": metadata or {}
+                })
+                rows.append((anonymous_id, action, data_hash, metadata or {}))
+            
+            levels = merkle_tree([data_hash for _, _, data_hash, _ in rows])
+            merkle_root = levels[-1][0]
+            
+            conn = self._get_connection()
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            
+            self._lock_chain_tip(cursor)
+            cursor.execute('SELECT block_number, block_hash FROM blocks ORDER BY block_number DESC LIMIT 1')
+            last_block = cursor.fetchone()
+            if not last_block:
+                logger.error("❌ No genesis block found")
+                conn.close()
+                return None
+            
+            previous_hash = last_block['block_hash']
+            data = json.dumps({
+                "type": "AUDIT_BATCH",
+                "merkle_root": merkle_root,
+                "leaf_count": len(rows),
+                "timestamp": timestamp
+            })
+            block_hash, nonce = self._mine_block(last_block['block_number'] + 1, timestamp, previous_hash, data)
+            
+            cursor.execute('''
+                INSERT INTO blocks (timestamp, previous_hash, block_hash, data, nonce)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING block_number
+            ''', (timestamp_obj, previous_hash, block_hash, data, nonce))
+            block_number = cursor.fetchone()['block_number']
+            
+            cursor.executemany('''
+                INSERT INTO audit_logs 
+                (block_number, anonymous_id, action, data_hash, metadata, timestamp)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', [
+                (
+                    block_number, anonymous_id, action, data_hash,
+                    json.dumps({
+                        **metadata,
+                        "merkle_index": index,
+                        "merkle_proof": merkle_proof(levels, index)
+                    }, default=str),
+                    timestamp_obj
+                )
+                for index, (anonymous_id, action, data_hash, metadata) in enumerate(rows)
+            ])
+            
+            conn.commit()
+            cursor.close()
+            conn.close()
+            
+            logger.info(f"✅ {len(rows)} audits logged to cloud blockchain: Block #{block_number}, root {merkle_root[:10]}...")
+            return {
+                "tx_hash": block_hash,
+                "block_number": block_number,
+                "merkle_root": merkle_root,
+                "leaf_count": len(rows),
+                "timestamp": timestamp,
+                "status": "success"
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Cloud blockchain batch audit failed ({len(entries)} entries): {e}")
+            if conn:
+                conn.rollback()
+                conn.close()
+            return None
+    
+    def get_tip_height(self) -> int:
+        """Number of the newest block (over the persistent tip connection)"""
+        with self._tip_lock:
+            for attempt in range(2):
+                if self._tip_conn is None or self._tip_conn.closed:
+                    self._tip_conn = self._get_connection()
+                    self._tip_conn.autocommit = True
+                try:
+                    with self._tip_conn.cursor() as cursor:
+                        cursor.execute('SELECT MAX(block_number) FROM blocks')
+                        return cursor.fetchone()[0] or 0
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    # Server or network dropped the idle connection - reconnect once
+                    self._tip_conn.close()
+                    self._tip_conn = None
+                    if attempt:
+                        raise
+    
     def get_audit_trail(self, anonymous_id: str) -> List[Dict[str, Any]]:
         """Get complete audit trail for a user"""
         conn = None
@@ -406,6 +551,7 @@ class PostgresBlockchainAuditLogger:
     def __init__(self, connection_url: str = None):
         self.blockchain = PostgresBlockchain(connection_url)
         self.enabled = True
+        self._reads = ChainReadCache(self.blockchain.get_tip_height)
         logger.info("✅ Cloud PostgreSQL blockchain audit logger initialized")
     
     async def log_action(self, user_id: str = None, anonymous_id: str = None, 
@@ -427,12 +573,27 @@ class PostgresBlockchainAuditLogger:
         meta = data or metadata or {}
         
         logger.info(f"   → Calling blockchain.log_audit({anon_id}, {action}, {type(meta)})")
-        return self.blockchain.log_audit(anon_id, action, meta)
+        # psycopg2 + mining are blocking - keep them off the event loop
+        return await asyncio.to_thread(self.blockchain.log_audit, anon_id, action, meta)
+    
+    async def log_actions(self, actions: List[Tuple[str, str, Dict[str, Any]]]) -> Optional[Dict]:
+        """Log (user_id, action, data) tuples to cloud blockchain as one Merkle-batched block"""
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.blockchain.log_audit_batch, actions)
     
     def get_audit_trail(self, anonymous_id: str) -> List[Dict[str, Any]]:
-        """Get audit trail for user"""
-        return self.blockchain.get_audit_trail(anonymous_id)
+        """Get audit trail for user (cached until the next block)"""
+        return self._reads.get(("audit_trail", anonymous_id), lambda: self.blockchain.get_audit_trail(anonymous_id))
     
     def get_statistics(self) -> Dict[str, Any]:
-        """Get blockchain statistics"""
-        return self.blockchain.get_statistics()
+        """Get blockchain statistics (cached until the next block)"""
+        return self._reads.get(("statistics",), self.blockchain.get_statistics)
+    
+    async def aget_audit_trail(self, anonymous_id: str) -> List[Dict[str, Any]]:
+        """get_audit_trail without blocking the event loop"""
+        return await asyncio.to_thread(self.get_audit_trail, anonymous_id)
+    
+    async def aget_statistics(self) -> Dict[str, Any]:
+        """get_statistics without blocking the event loop"""
+        return await asyncio.to_thread(self.get_statistics)
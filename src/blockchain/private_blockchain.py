@@ -3,15 +3,23 @@ SIMPLIFIED PRIVATE BLOCKCHAIN SOLUTION
 Using local SQLite blockchain (offline, private, instant)
 """
 
+import asyncio
 import sqlite3
 import hashlib
 import json
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 
+from src.blockchain.merkle import leaf_hash, merkle_tree, merkle_proof
+from src.blockchain.read_cache import ChainReadCache
+
 logger = logging.getLogger(__name__)
 
+# Seconds an append waits for another process to release the SQLite write lock
+APPEND_LOCK_TIMEOUT = 30
+
 
 class PrivateBlockchain:
     """
@@ -25,6 +33,9 @@ class PrivateBlockchain:
     
     def __init__(self, db_path: str = "data/blockchain.db"):
         self.db_path = db_path
+        # Appends read the chain tip and then insert. Across processes they are serialized by
+        # SQLite's write lock (see _begin_append); this lock just queues this process's threads
+        self._append_lock = threading.Lock()
         self._init_database()
         logger.info(f"✅ Private blockchain initialized: {db_path}")
     
@@ -103,14 +114,22 @@ class PrivateBlockchain:
         content = f"{block_number}{previous_hash}{data}{nonce}"
         return hashlib.sha256(content.encode()).hexdigest()
     
-    def _mine_block(self, previous_hash: str, data: str, difficulty: int = 2) -> tuple:
+    def _mine_block(self, previous_hash: str, data: str, difficulty: int = 2, block_number: Optional[int] = None) -> tuple:
         """Mine a new block with proof-of-work"""
         nonce = 0
-        block_number = self._get_last_block_number() + 1
+        if block_number is None:
+            block_number = self._get_last_block_number() + 1
+        
+        target = "0" * difficulty
+        # The nonce is the last field hashed - hash the fixed prefix once and
+        # only feed the nonce per attempt (same digest as _calculate_hash)
+        prefix = hashlib.sha256(f"{block_number}{previous_hash}{data}".encode())
         
         while True:
-            block_hash = self._calculate_hash(block_number, previous_hash, data, nonce)
-            if block_hash[:difficulty] == "0" * difficulty:
+            attempt = prefix.copy()
+            attempt.update(str(nonce).encode())
+            block_hash = attempt.hexdigest()
+            if block_hash.startswith(target):
                 return block_hash, nonce
             nonce += 1
             
@@ -127,6 +146,20 @@ class PrivateBlockchain:
         conn.close()
         return result if result else 0
     
+    def _begin_append(self) -> Tuple[sqlite3.Connection, Tuple[int, str]]:
+        """
+        Open a connection holding SQLite's write lock (BEGIN IMMEDIATE) and read the chain tip under it
+        Every process appending to this file queues here, so two writers can't mine on the same tip
+        """
+        conn = sqlite3.connect(self.db_path, timeout=APPEND_LOCK_TIMEOUT)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            tip = conn.execute('SELECT block_number, block_hash FROM blocks ORDER BY block_number DESC LIMIT 1').fetchone()
+        except Exception:
+            conn.close()
+            raise
+        return conn, (tip if tip else (0, "0"))
+    
     def _get_last_block_hash(self) -> str:
         """Get hash of the last block"""
         conn = sqlite3.connect(self.db_path)
@@ -155,6 +188,28 @@ class PrivateBlockchain:
         Returns:
             Block details with transaction info
         """
+        # Mining + SQLite writes are blocking - keep them off the event loop
+        return await asyncio.to_thread(self._log_audit_sync, anonymous_id, action, data_hash, metadata)
+    
+    def _log_audit_sync(
+        self,
+        anonymous_id: str,
+        action: str,
+        data_hash: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Blocking implementation of log_audit"""
+        with self._append_lock:
+            return self._append_audit_block(anonymous_id, action, data_hash, metadata)
+    
+    def _append_audit_block(
+        self,
+        anonymous_id: str,
+        action: str,
+        data_hash: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        conn = None
         try:
             timestamp = datetime.utcnow().isoformat()
             
@@ -167,13 +222,12 @@ class PrivateBlockchain:
                 "timestamp": timestamp
             }
             
-            # Mine new block
-            previous_hash = self._get_last_block_hash()
+            # Mine new block on the tip, read under the database write lock
+            conn, (last_block_number, previous_hash) = self._begin_append()
             block_data = json.dumps(audit_data)
-            block_hash, nonce = self._mine_block(previous_hash, block_data)
+            block_hash, nonce = self._mine_block(previous_hash, block_data, block_number=last_block_number + 1)
             
             # Save to database
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -203,7 +257,106 @@ class PrivateBlockchain:
             
         except Exception as e:
             logger.error(f"❌ Blockchain audit failed: {e}")
+            if conn:
+                conn.rollback()
+                conn.close()
+            return None
+    
+    async def log_audit_batch(self, entries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Log several audits under a single block
+        
+        Args:
+            entries: Dicts with anonymous_id, action, data_hash and optional metadata
+            
+        Returns:
+            Details of the batch block (tx_hash, block_number, merkle_root), or None if it failed
+        """
+        return await asyncio.to_thread(self._log_audit_batch_sync, entries)
+    
+    def _log_audit_batch_sync(self, entries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Blocking implementation of log_audit_batch"""
+        with self._append_lock:
+            return self._append_audit_batch_block(entries)
+    
+    @staticmethod
+    def _audit_leaf(anonymous_id: str, action: str, data_hash: str, metadata: Dict[str, Any], timestamp: str) -> str:
+        """Merkle leaf for one audit_logs row - commits to every stored column, not just data_hash"""
+        return leaf_hash({
+            "anonymous_id": anonymous_id,
+            "action": action,
+            "data_hash": data_hash,
+            "metadata": metadata,
+            "timestamp": timestamp
+        })
+    
+    def _append_audit_batch_block(self, entries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Mine one block over the Merkle root of the entries' full records; each entry stores its proof"""
+        if not entries:
+            return None
+        
+        conn = None
+        try:
+            timestamp = datetime.utcnow().isoformat()
+            levels = merkle_tree([
+                self._audit_leaf(entry["anonymous_id"], entry["action"], entry["data_hash"],
+                                 entry.get("metadata") or {}, timestamp)
+                for entry in entries
+            ])
+            merkle_root = levels[-1][0]
+            
+            conn, (last_block_number, previous_hash) = self._begin_append()
+            cursor = conn.cursor()
+            
+            block_data = json.dumps({
+                "type": "AUDIT_BATCH",
+                "merkle_root": merkle_root,
+                "leaf_count": len(entries),
+                "timestamp": timestamp
+            })
+            block_hash, nonce = self._mine_block(previous_hash, block_data, block_number=last_block_number + 1)
+            
+            cursor.execute('''
+                INSERT INTO blocks (timestamp, previous_hash, block_hash, data, nonce)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (timestamp, previous_hash, block_hash, block_data, nonce))
+            block_number = cursor.lastrowid
+            
+            cursor.executemany('''
+                INSERT INTO audit_logs (block_number, anonymous_id, action, data_hash, metadata, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [
+                (
+                    block_number, entry["anonymous_id"], entry["action"], entry["data_hash"],
+                    json.dumps({
+                        **(entry.get("metadata") or {}),
+                        "merkle_index": index,
+                        "merkle_proof": merkle_proof(levels, index)
+                    }),
+                    timestamp
+                )
+                for index, entry in enumerate(entries)
+            ])
+            
+            conn.commit()
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"❌ Blockchain batch audit failed ({len(entries)} entries): {e}")
             return None
+        finally:
+            if conn:
+                conn.close()
+        
+        logger.info(f"✅ {len(entries)} audits logged to blockchain: Block #{block_number}, root {merkle_root[:10]}...")
+        return {
+            "tx_hash": block_hash,
+            "block_number": block_number,
+            "merkle_root": merkle_root,
+            "leaf_count": len(entries),
+            "timestamp": timestamp,
+            "status": "success"
+        }
     
     def get_audit_trail(self, anonymous_id: str) -> List[Dict[str, Any]]:
         """Get complete audit trail for a user"""
@@ -259,9 +412,54 @@ class PrivateBlockchain:
                 logger.error(f"❌ Hash mismatch at block {current[0]}")
                 return False
         
+        if not self._verify_batch_entries(blocks):
+            return False
+        
         logger.info("✅ Blockchain integrity verified")
         return True
     
+    def _verify_batch_entries(self, blocks: List[tuple]) -> bool:
+        """Check every batch block's audit_logs rows against its Merkle root and leaf count"""
+        batches = {}
+        for block in blocks:
+            try:
+                data = json.loads(block[4])
+            except ValueError:
+                continue
+            if isinstance(data, dict) and data.get("type") == "AUDIT_BATCH":
+                batches[block[0]] = data
+        if not batches:
+            return True
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT block_number, anonymous_id, action, data_hash, metadata, timestamp
+            FROM audit_logs ORDER BY block_number, id
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+        
+        leaves: Dict[int, List[str]] = {block_number: [] for block_number in batches}
+        for block_number, anonymous_id, action, data_hash, metadata, timestamp in rows:
+            if block_number not in leaves:
+                continue
+            metadata = json.loads(metadata) if metadata else {}
+            metadata.pop("merkle_index", None)
+            metadata.pop("merkle_proof", None)
+            leaves[block_number].append(self._audit_leaf(anonymous_id, action, data_hash, metadata, timestamp))
+        
+        for block_number, data in batches.items():
+            block_leaves = leaves[block_number]
+            # The leaf count pins the batch size (odd levels duplicate their last node)
+            if not block_leaves or len(block_leaves) != data.get("leaf_count"):
+                logger.error(f"❌ Audit entry count mismatch at block {block_number}")
+                return False
+            if merkle_tree(block_leaves)[-1][0] != data.get("merkle_root"):
+                logger.error(f"❌ Audit entries don't match the Merkle root of block {block_number}")
+                return False
+        return True
+    
     def get_statistics(self) -> Dict[str, Any]:
         """Get blockchain statistics"""
         conn = sqlite3.connect(self.db_path)
@@ -298,6 +496,7 @@ class PrivateBlockchainAuditLogger:
     def __init__(self):
         self.blockchain = PrivateBlockchain()
         self.enabled = True
+        self._reads = ChainReadCache(self.blockchain._get_last_block_number)
         logger.info("✅ Private blockchain audit logger initialized")
     
     async def log_action(
@@ -327,10 +526,35 @@ class PrivateBlockchainAuditLogger:
         
         return result
     
+    async def log_actions(self, actions: List[Tuple[str, str, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Log (user_id, action, data) tuples to the private blockchain as one Merkle-batched block"""
+        if not self.enabled:
+            return None
+        
+        timestamp = datetime.utcnow().isoformat()
+        entries = [
+            {
+                "anonymous_id": user_id,
+                "action": action,
+                "data_hash": hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest(),
+                "metadata": {"timestamp": timestamp, **data}
+            }
+            for user_id, action, data in actions
+        ]
+        return await self.blockchain.log_audit_batch(entries)
+    
     def get_audit_trail(self, anonymous_id: str) -> List[Dict[str, Any]]:
-        """Get audit trail for user"""
-        return self.blockchain.get_audit_trail(anonymous_id)
+        """Get audit trail for user (cached until the next block)"""
+        return self._reads.get(("audit_trail", anonymous_id), lambda: self.blockchain.get_audit_trail(anonymous_id))
     
     def get_statistics(self) -> Dict[str, Any]:
-        """Get blockchain statistics"""
-        return self.blockchain.get_statistics()
+        """Get blockchain statistics (cached until the next block)"""
+        return self._reads.get(("statistics",), self.blockchain.get_statistics)
+    
+    async def aget_audit_trail(self, anonymous_id: str) -> List[Dict[str, Any]]:
+        """get_audit_trail without blocking the event loop"""
+        return await asyncio.to_thread(self.get_audit_trail, anonymous_id)
+    
+    async def aget_statistics(self) -> Dict[str, Any]:
+        """get_statistics without blocking the event loop"""
+        return await asyncio.to_thread(self.get_statistics)
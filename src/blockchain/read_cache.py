@@ -0,0 +1,43 @@
+"""
+Read cache for the audit chains
+The chain is append-only, so a read is valid until the next block - entries are
+keyed on the tip height, with a TTL so integrity is still re-checked periodically
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Hashable, Tuple
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ChainReadCache:
+    """Caches chain reads (audit trails, statistics) until a new block is appended"""
+
+    def __init__(self, tip_height: Callable[[], int], maxsize: int = 1024, ttl: float = 60,
+                 timer: Callable[[], float] = time.monotonic):
+        self._tip_height = tip_height
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        # Reads run in worker threads and TTLCache isn't thread-safe
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key at the current tip, computing it on a miss"""
+        try:
+            cache_key = (self._tip_height(), *key)
+        except Exception as e:
+            logger.warning(f"⚠️ Chain tip lookup failed, reading uncached: {e}")
+            return compute()
+
+        with self._lock:
+            value = self._cache.get(cache_key)
+        if value is not None:
+            return value
+
+        value = compute()
+        with self._lock:
+            self._cache[cache_key] = value
+        return value
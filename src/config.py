@@ -91,6 +91,7 @@ class HealthcareConfig:
         print("   -> Loading shared reranker (ms-marco-MiniLM-L-6-v2)...")
         shared_reranker = Reranker()
         print("   ✓ Shared models loaded")
+        self.embedding_manager = shared_embedding_manager
         
         self.rag_retrievers: Dict[str, Retriever] = {}
         self.vector_stores: Dict[str, VectorStore] = {}
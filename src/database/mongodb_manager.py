@@ -2,11 +2,20 @@
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure
 from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Name of the old sparse, non-unique firebase_uid index (replaced by FIREBASE_UID_INDEX)
+LEGACY_FIREBASE_UID_INDEX = "firebase_uid_1"
+FIREBASE_UID_INDEX = "firebase_uid_unique"
+
+# Connection pool sizing (per worker process - keep MAX x workers under the cluster's connection limit)
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "200"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "10"))
+
 
 class MongoDBManager:
     """MongoDB Atlas connection manager"""
@@ -33,13 +42,20 @@ class MongoDBManager:
                     socketTimeoutMS=60000,  # 60s socket timeout
                     connectTimeoutMS=60000,  # 60s connect timeout
                     retryWrites=True,  # Enable retry writes
-                    maxPoolSize=50,  # Increase connection pool
+                    maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                    minPoolSize=MONGODB_MIN_POOL_SIZE,  # Kept open so bursts don't pay TLS handshakes
+                    maxIdleTimeMS=300000,  # Recycle connections idle for 5 minutes
+                    waitQueueTimeoutMS=5000,  # Fail fast instead of queueing forever on an exhausted pool
                     # Add directConnection=False to use DNS SRV properly
                     directConnection=False
                 )
                 
-                # Verify connection
+                # Verify connection, then open minPoolSize connections up front
+                # (concurrent pings each check out their own connection)
                 await self.client.admin.command('ping')
+                await asyncio.gather(*(
+                    self.client.admin.command('ping') for _ in range(MONGODB_MIN_POOL_SIZE)
+                ))
                 self.db = self.client[self.database_name]
                 logger.info(f"✅ Connected to MongoDB: {self.database_name}")
                 
@@ -56,37 +72,85 @@ class MongoDBManager:
                     logger.error("❌ All connection attempts failed")
                     raise
     
-    async def _create_indexes(self):
-        """Create database indexes"""
+    async def _ensure_firebase_uid_index(self):
+        """
+        One account per Firebase UID - firebase_login's race handling depends on it, so unlike
+        the other indexes a failure here aborts startup. Email/password users store null and
+        are excluded by the partial filter.
+        """
+        # The old sparse index has the same key, and its options conflict with the unique one
+        try:
+            await self.db.users.drop_index(LEGACY_FIREBASE_UID_INDEX)
+            logger.info(f"🗑️ Dropped legacy index users.{LEGACY_FIREBASE_UID_INDEX}")
+        except OperationFailure as e:
+            if e.code != 27:  # IndexNotFound - already replaced
+                raise
+        
         try:
-            # Users collection - firebase_uid is indexed but not unique (allows multiple nulls)
-            await self.db.users.create_index("firebase_uid", sparse=True)
-            await self.db.users.create_index("blockchain_identity")
+            await self.db.users.create_index(
+                "firebase_uid",
+                name=FIREBASE_UID_INDEX,
+                unique=True,
+                partialFilterExpression={"firebase_uid": {"$type": "string"}},
+            )
+        except OperationFailure as e:
+            logger.error(f"❌ Could not create unique index users.{FIREBASE_UID_INDEX} (duplicate Firebase accounts?): {e}")
+            raise
+    
+    async def _create_indexes(self):
+        """Create database indexes (all requests issued concurrently)"""
+        import asyncio
+        
+        await self._ensure_firebase_uid_index()
+        
+        # Index builds are a deploy-time concern; set MONGODB_CREATE_INDEXES=false on
+        # workers that don't need to re-issue them on every boot / reload
+        if os.getenv("MONGODB_CREATE_INDEXES", "true").lower() in ("0", "false", "no"):
+            logger.info("⏭️ Skipping index creation (MONGODB_CREATE_INDEXES=false)")
+            return
+        
+        index_specs = [
+            # Users collection (firebase_uid's unique index is created above)
+            (self.db.users, "blockchain_identity", {}),
+            # signup/login lookup - not unique: a Google account and an email/password
+            # account for the same address are separate users sharing this hash
+            (self.db.users, "email_hash", {}),
             
             # Sessions collection
-            await self.db.sessions.create_index([("user_id", 1), ("created_at", -1)])
-            await self.db.sessions.create_index("blockchain_session_hash")
+            (self.db.sessions, [("user_id", 1), ("created_at", -1)], {}),
+            (self.db.sessions, [("user_id", 1), ("status", 1), ("updated_at", -1)], {}),  # session list
+            (self.db.sessions, "blockchain_session_hash", {}),
             
             # Messages collection
-            await self.db.messages.create_index([("session_id", 1), ("timestamp", 1)])
-            await self.db.messages.create_index("blockchain_tx_hash")
+            (self.db.messages, [("session_id", 1), ("timestamp", 1)], {}),
+            (self.db.messages, "blockchain_tx_hash", {}),
+            
+            # Uploaded documents - /chat context (processed, newest first) and the documents list
+            (self.db.user_documents, [("user_id", 1), ("status", 1), ("upload_date", -1)], {}),
+            (self.db.user_documents, [("user_id", 1), ("upload_date", -1)], {}),
             
             # Audit logs collection
-            await self.db.audit_logs.create_index([("user_id", 1), ("timestamp", -1)])
-            await self.db.audit_logs.create_index("action")
+            (self.db.audit_logs, [("user_id", 1), ("timestamp", -1)], {}),
+            (self.db.audit_logs, "action", {}),
             
             # Encryption keys
-            await self.db.encryption_keys.create_index("key_id", unique=True)
-            await self.db.encryption_keys.create_index("status")
+            (self.db.encryption_keys, "key_id", {"unique": True}),
+            (self.db.encryption_keys, "status", {}),
             
             # Blockchain records
-            await self.db.blockchain_records.create_index("blockchain_tx_hash", unique=True)
-            await self.db.blockchain_records.create_index([("verified", 1), ("timestamp", -1)])
-            
-            logger.info("✅ Database indexes created")
-            
-        except Exception as e:
-            logger.warning(f"⚠️ Index creation warning: {e}")
+            (self.db.blockchain_records, "blockchain_tx_hash", {"unique": True}),
+            (self.db.blockchain_records, [("verified", 1), ("timestamp", -1)], {}),
+        ]
+        
+        results = await asyncio.gather(
+            *(collection.create_index(keys, **options) for collection, keys, options in index_specs),
+            return_exceptions=True
+        )
+        
+        failures = [r for r in results if isinstance(r, Exception)]
+        for failure in failures:
+            logger.warning(f"⚠️ Index creation warning: {failure}")
+        logger.info(f"✅ Database indexes created ({len(results) - len(failures)}/{len(results)})")
     
     async def close(self):
         """Close MongoDB connection"""
@@ -0,0 +1,64 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-query embedding calls into one batched model call.
+
+    Retrievers run in worker threads (asyncio.to_thread), so several of them can
+    ask for an embedding at the same time. Each caller blocks on a Future while a
+    single background thread embeds everything queued within a short window.
+    """
+
+    def __init__(self, embed_batch_fn: Callable[[List[str]], List[List[float]]],
+                 max_batch: int = 16, max_wait: float = 0.005):
+        """
+        Args:
+            embed_batch_fn: Function embedding a list of texts in one call
+            max_batch: Maximum texts per model call
+            max_wait: Seconds to wait for more requests after the first one arrives
+        """
+        self.embed_batch_fn = embed_batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed(self, text: str) -> List[float]:
+        """Embed one text, sharing the model call with any concurrent requests."""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = list(self.embed_batch_fn(texts))
+                # zip() would silently leave the extra callers waiting forever
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Embedding backend returned {len(vectors)} vectors for {len(batch)} texts")
+            except Exception as e:
+                logger.error(f"❌ Batched embedding failed ({len(batch)} texts): {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            if len(batch) > 1:
+                logger.debug(f"Embedded {len(batch)} queries in one batch")
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
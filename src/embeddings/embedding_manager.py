@@ -3,6 +3,7 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.embeddings import CohereEmbeddings
 from config.settings import settings
+from src.embeddings.batcher import EmbeddingBatcher
 import numpy as np
 import logging
 from tqdm import tqdm
@@ -22,6 +23,12 @@ class EmbeddingManager:
         self.model_name = model_name or settings.EMBEDDING_MODEL
         self.batch_size = settings.BATCH_SIZE
         self.embeddings = self._initialize_embeddings()
+        
+        # Concurrent query embeddings share one model call. Cohere embeds queries
+        # differently from documents (input_type), so it keeps the direct path.
+        self._query_batcher = None
+        if settings.EMBEDDING_MICROBATCH and not self.model_name.startswith("embed-"):
+            self._query_batcher = EmbeddingBatcher(self.embeddings.embed_documents)
     
     def _initialize_embeddings(self):
         """Initialize the appropriate embedding model."""
@@ -106,6 +113,8 @@ class EmbeddingManager:
             Embedding vector
         """
         try:
+            if self._query_batcher:
+                return self._query_batcher.embed(text)
             return self.embeddings.embed_query(text)
         except Exception as e:
             logger.error(f"Error embedding query: {e}")
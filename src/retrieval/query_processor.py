@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Optional, Dict, Any, List
 from langchain_community.chat_models import ChatOpenAI
 from config.settings import settings
@@ -9,6 +10,19 @@ import re
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def get_query_llm() -> ChatOpenAI:
+    """
+    Shared LLM for the gatekeeper, optimizer and auditor of every retriever
+    One client means one pooled set of keep-alive connections instead of one per component
+    """
+    return ChatOpenAI(
+        model="gpt-3.5-turbo",
+        temperature=0,
+        openai_api_key=settings.OPENAI_API_KEY
+    )
+
+
 class Gatekeeper:
     """
     Checks if queries are specific enough before processing.
@@ -22,11 +36,7 @@ class Gatekeeper:
         
         if settings.OPENAI_API_KEY:
             try:
-                self.llm = ChatOpenAI(
-                    model="gpt-3.5-turbo",
-                    temperature=0,
-                    openai_api_key=settings.OPENAI_API_KEY
-                )
+                self.llm = get_query_llm()
                 self.enabled = True
                 logger.info("Gatekeeper initialized with LLM support")
             except Exception as e:
@@ -116,11 +126,7 @@ class QueryOptimizer:
 
         if settings.OPENAI_API_KEY:
             try:
-                self.llm = ChatOpenAI(
-                    model="gpt-3.5-turbo",
-                    temperature=0,
-                    openai_api_key=settings.OPENAI_API_KEY
-                )
+                self.llm = get_query_llm()
                 self.enabled = True
                 logger.info("QueryOptimizer initialized with LLM support")
             except Exception as e:
@@ -371,11 +377,7 @@ class Auditor:
         
         if settings.OPENAI_API_KEY:
             try:
-                self.llm = ChatOpenAI(
-                    model="gpt-3.5-turbo",
-                    temperature=0,
-                    openai_api_key=settings.OPENAI_API_KEY
-                )
+                self.llm = get_query_llm()
                 self.enabled = True
                 logger.info("Auditor initialized with LLM support")
             except Exception as e:
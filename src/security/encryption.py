@@ -2,11 +2,12 @@
 import os
 import base64
 import hashlib
+from functools import lru_cache
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
-from typing import Optional
+from typing import List, Optional
 import secrets
 import logging
 
@@ -36,6 +37,10 @@ class PHIEncryptionManager:
             raise ValueError("Master key must be 64 hex characters (256 bits)")
         
         self.master_key_bytes = bytes.fromhex(self.master_key)
+        
+        # PBKDF2 (100k iterations) costs tens of ms per derivation and a request touches
+        # the same user's fields several times - derive each user's cipher once
+        self._fernet = lru_cache(maxsize=4096)(self._build_fernet)
     
     def generate_user_salt(self) -> str:
         """Generate a unique salt for user-specific encryption"""
@@ -52,6 +57,10 @@ class PHIEncryptionManager:
         )
         return base64.urlsafe_b64encode(kdf.derive(self.master_key_bytes))
     
+    def _build_fernet(self, salt: str) -> Fernet:
+        """Fernet (AES via OpenSSL) for a user salt - cached per salt in __init__"""
+        return Fernet(self._derive_key(salt))
+    
     def encrypt(self, data: str, user_salt: str) -> str:
         """
         Encrypt PHI data
@@ -64,8 +73,7 @@ class PHIEncryptionManager:
             Base64-encoded encrypted data
         """
         try:
-            key = self._derive_key(user_salt)
-            f = Fernet(key)
+            f = self._fernet(user_salt)
             encrypted = f.encrypt(data.encode())
             return encrypted.decode()
         except Exception as e:
@@ -84,14 +92,28 @@ class PHIEncryptionManager:
             Decrypted plain text
         """
         try:
-            key = self._derive_key(user_salt)
-            f = Fernet(key)
+            f = self._fernet(user_salt)
             decrypted = f.decrypt(encrypted_data.encode())
             return decrypted.decode()
         except Exception as e:
             logger.error(f"Decryption failed: {e}")
             raise
     
+    def decrypt_many(self, encrypted_items: List[str], user_salt: str) -> List[Optional[str]]:
+        """
+        Decrypt several values for one user with a single cipher lookup
+        Items that fail to decrypt come back as None (logged) instead of failing the batch
+        """
+        f = self._fernet(user_salt)
+        results = []
+        for item in encrypted_items:
+            try:
+                results.append(f.decrypt(item.encode()).decode())
+            except Exception as e:
+                logger.error(f"Decryption failed: {e}")
+                results.append(None)
+        return results
+    
     @staticmethod
     def hash_for_audit(data: str) -> str:
         """
@@ -0,0 +1,203 @@
+# src/utils/audio.py
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import time
+from typing import BinaryIO, Dict, Tuple
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    from blake3 import blake3
+except ImportError:  # optional - hashlib fallback below
+    blake3 = None
+
+logger = logging.getLogger(__name__)
+
+# Small clips are already cheap to upload - transcoding them costs more than it saves
+TRANSCODE_MIN_BYTES = 32 * 1024
+
+# pydub shells out to ffmpeg (a system package, not pip-installable); without it uploads go to Whisper as-is
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None
+if not FFMPEG_AVAILABLE:
+    logger.warning("⚠️ ffmpeg not found on PATH - audio is sent to Whisper without transcoding")
+
+
+def compress_for_whisper(audio: BinaryIO, size: int, filename: str) -> Tuple[BinaryIO, str]:
+    """
+    Re-encode uploaded audio to 12 kHz mono 16 kbps MP3 before sending it to Whisper.
+    Whisper latency is dominated by upload size, and speech survives this bitrate fine.
+    Takes the spooled upload and its size; returns (file, filename) rewound to the start,
+    falling back to the original upload if ffmpeg is missing or transcoding fails.
+    Blocking (ffmpeg subprocess) - call via asyncio.to_thread.
+    """
+    if size < TRANSCODE_MIN_BYTES or not FFMPEG_AVAILABLE:
+        return audio, filename
+
+    try:
+        from pydub import AudioSegment
+
+        segment = AudioSegment.from_file(audio)
+        segment = segment.set_channels(1).set_frame_rate(12000)
+
+        out = io.BytesIO()
+        segment.export(out, format="mp3", bitrate="16k")
+    except Exception as e:
+        logger.warning(f"⚠️ Audio transcode failed, sending original upload: {e}")
+        audio.seek(0)
+        return audio, filename
+
+    compressed_size = out.tell()
+    if compressed_size >= size:
+        audio.seek(0)
+        return audio, filename
+
+    logger.info(f"🎙️ Compressed audio for Whisper: {size} -> {compressed_size} bytes")
+    out.seek(0)
+    return out, "audio.mp3"
+
+
+# Markup stripped before speech synthesis, compiled once and applied in order
+_TTS_CLEANUP = [
+    # Citations
+    (re.compile(r'\[Source:.*?\]'), ''),
+    (re.compile(r'\[\d+\]'), ''),
+    (re.compile(r'\[Citation:.*?\]'), ''),
+    # Markdown formatting
+    (re.compile(r'#{1,6}\s*'), ''),  # Headers (###)
+    (re.compile(r'\*\*(.*?)\*\*'), r'\1'),  # Bold
+    (re.compile(r'\*(.*?)\*'), r'\1'),  # Italic
+    (re.compile(r'`(.*?)`'), r'\1'),  # Inline code
+    (re.compile(r'^\s*[-*+]\s+', re.MULTILINE), ''),  # List markers
+    (re.compile(r'^\s*\d+\.\s+', re.MULTILINE), ''),  # Numbered lists
+    # Emojis and other symbols
+    (re.compile(r'[^\w\s,.!?;:()\-\'/"]'), ''),
+    # Newlines become sentence breaks, then collapse whitespace
+    (re.compile(r'\n+'), '. '),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def clean_text_for_tts(text: str) -> str:
+    """Strip citations, markdown and emojis so only the spoken text is synthesized"""
+    for pattern, replacement in _TTS_CLEANUP:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def audio_cache_key(text: str) -> str:
+    """
+    Filename-safe cache key for generated audio (32 hex chars)
+    Not a security boundary, just a fast content fingerprint - BLAKE3 when installed, else SHA-256
+    """
+    data = text.encode("utf-8")
+    if blake3 is not None:
+        return blake3(data).hexdigest(length=16)
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+class CachedAudioFiles(StaticFiles):
+    """
+    Static file serving for the TTS audio cache
+    Filenames are content hashes, so a given URL never changes and can be cached forever
+
+    Audio URLs are handed out before synthesis finishes. The job's worker waits on an
+    in-memory Event; other workers see the job through a `<file>.pending` marker and poll
+    until the finished file is renamed into place. Markers and partial `.part` files live
+    in work_dir, outside the served directory (same filesystem, so the rename is atomic).
+    """
+
+    PENDING_SUFFIX = ".pending"
+    PART_SUFFIX = ".part"
+
+    def __init__(self, *args, work_dir: str, pending_timeout: float = 60, poll_interval: float = 0.1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.work_dir = work_dir
+        # filename -> Event set once a background TTS job in this process has finished with that file
+        self.pending: Dict[str, asyncio.Event] = {}
+        self.pending_timeout = pending_timeout
+        self.poll_interval = poll_interval
+
+    def _marker(self, filename: str) -> str:
+        return os.path.join(self.work_dir, filename + self.PENDING_SUFFIX)
+
+    def part_path(self, filename: str) -> str:
+        """Unique temp path to write a file before renaming it into the served directory"""
+        return os.path.join(self.work_dir, f"{filename}.{os.urandom(4).hex()}{self.PART_SUFFIX}")
+
+    def _touch_marker(self, filename: str) -> None:
+        with open(self._marker(filename), "w"):
+            pass
+
+    def _remove_marker(self, filename: str) -> None:
+        try:
+            os.remove(self._marker(filename))
+        except FileNotFoundError:
+            pass
+
+    async def begin(self, filename: str) -> bool:
+        """Register a synthesis job for filename; False if one is already running (in any worker)"""
+        if filename in self.pending or await asyncio.to_thread(self.is_pending_elsewhere, filename):
+            return False
+        self.pending[filename] = asyncio.Event()
+        # Written before the URL goes out, so every worker can see the job from the first GET
+        try:
+            await asyncio.to_thread(self._touch_marker, filename)
+        except Exception:
+            self.pending.pop(filename).set()
+            raise
+        return True
+
+    async def finish(self, filename: str) -> None:
+        """Mark a job done (file written or failed) and release waiting requests"""
+        try:
+            await asyncio.to_thread(self._remove_marker, filename)
+        finally:
+            event = self.pending.pop(filename, None)
+            if event is not None:
+                event.set()
+
+    def is_pending_elsewhere(self, filename: str) -> bool:
+        """A fresh marker from another worker's job (stale ones from a crashed worker are ignored). Blocking"""
+        try:
+            age = time.time() - os.path.getmtime(self._marker(filename))
+        except OSError:
+            return False
+        return age < self.pending_timeout
+
+    async def get_response(self, path, scope):
+        # Never serve job bookkeeping, e.g. files left in the served directory by older versions
+        if path.endswith((self.PENDING_SUFFIX, self.PART_SUFFIX)):
+            raise HTTPException(status_code=404)
+
+        # Audio still being synthesized: hold the request until it's written
+        event = self.pending.get(path)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), self.pending_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Timed out waiting for TTS audio: {path}")
+        elif await asyncio.to_thread(self.is_pending_elsewhere, path):
+            # Job runs in another worker - poll until its marker is gone
+            deadline = time.monotonic() + self.pending_timeout
+            while time.monotonic() < deadline and await asyncio.to_thread(self.is_pending_elsewhere, path):
+                await asyncio.sleep(self.poll_interval)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        # FileResponse handles Range requests and sends the body with sendfile where available
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        # The filename stem is the content hash - a validator that is stable across
+        # workers and hosts, unlike the default mtime/size ETag
+        response.headers["etag"] = f'"{os.path.basename(full_path).split(".", 1)[0]}"'
+        response.headers["cache-control"] = "public, max-age=31536000, immutable"
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
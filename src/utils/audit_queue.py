@@ -0,0 +1,75 @@
+# src/utils/audit_queue.py
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    """
+    Buffers audit log documents and writes them with insert_many from a single worker
+    Request handlers only enqueue, so audit persistence is off the response path
+    """
+
+    def __init__(self, batch_size: int = 100, max_pending: int = 10_000,
+                 on_inserted: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """
+        on_inserted is called once per stored batch (e.g. to chain the whole batch to the blockchain)
+        max_pending bounds the buffer - once it is full, put() waits for the writer to catch up
+        """
+        self.batch_size = batch_size
+        self.on_inserted = on_inserted
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._collection = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self, collection) -> None:
+        """Start the writer against a Motor collection (call from the running loop)"""
+        self._collection = collection
+        self._worker = asyncio.create_task(self._run())
+        logger.info("✅ Audit log writer started")
+
+    async def put(self, doc: Dict[str, Any]) -> None:
+        """Queue a document; only waits (back-pressure) when max_pending entries are already buffered"""
+        if self._queue.full():
+            logger.warning("⚠️ Audit log buffer full, waiting for the writer")
+        await self._queue.put(doc)
+
+    async def stop(self) -> None:
+        """Flush everything queued, then stop the worker"""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info("✅ Audit log writer stopped")
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Take whatever else is already waiting - batches grow with load, no added latency
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            # Docs may carry their own _id; insert_many fills in any that are missing
+            await self._collection.insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error(f"❌ Audit log batch write failed ({len(batch)} entries): {e}")
+            return
+        if self.on_inserted:
+            try:
+                self.on_inserted(batch)
+            except Exception as e:
+                logger.error(f"❌ Audit post-insert hook failed: {e}")
@@ -0,0 +1,176 @@
+"""
+Response caches for the chat workflow
+Skip the full LLM + RAG pipeline when the same (or a semantically equivalent)
+query was already answered for the same user context
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from cachetools import TLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryCacheBackend:
+    """
+    Process-local LRU store with per-entry TTL
+    Entries are grouped by scope so lookups only compare vectors of the same context
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._scopes: Dict[str, "OrderedDict[int, Tuple[float, np.ndarray, Any]]"] = {}
+        self._lru: "OrderedDict[Tuple[str, int], None]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def entries(self, scope: str) -> List[Tuple[int, np.ndarray, Any]]:
+        """Return live (entry_id, vector, value) tuples for a scope, dropping expired ones"""
+        now = time.time()
+        with self._lock:
+            bucket = self._scopes.get(scope)
+            if not bucket:
+                return []
+            live = []
+            for entry_id, (expires_at, vector, value) in list(bucket.items()):
+                if expires_at <= now:
+                    self._remove(scope, entry_id)
+                else:
+                    live.append((entry_id, vector, value))
+            return live
+
+    def has_scope(self, scope: str) -> bool:
+        """Cheap check for any (possibly expired) entries in a scope"""
+        with self._lock:
+            return scope in self._scopes
+
+    def add(self, scope: str, vector: np.ndarray, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._scopes.setdefault(scope, OrderedDict())[entry_id] = (time.time() + ttl_seconds, vector, value)
+            self._lru[(scope, entry_id)] = None
+            while len(self._lru) > self.max_entries:
+                old_scope, old_id = next(iter(self._lru))
+                self._remove(old_scope, old_id)
+
+    def touch(self, scope: str, entry_id: int) -> None:
+        """Mark an entry as recently used"""
+        with self._lock:
+            if (scope, entry_id) in self._lru:
+                self._lru.move_to_end((scope, entry_id))
+
+    def _remove(self, scope: str, entry_id: int) -> None:
+        self._lru.pop((scope, entry_id), None)
+        bucket = self._scopes.get(scope)
+        if bucket is not None:
+            bucket.pop(entry_id, None)
+            if not bucket:
+                del self._scopes[scope]
+
+
+class ExactCache:
+    """
+    Exact-match cache keyed by SHA-256 of the (scope, normalized query) pair
+    Catches UI retries and replays before any embedding work is done
+    """
+
+    # Per-call values that must not be replayed from the cache
+    VOLATILE_FIELDS = ("timestamp", "profile_updated")
+
+    def __init__(self, maxsize: int = 10_000, ttl_seconds: float = 3600, timer: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        # Values are (ttl, result) so individual entries can expire sooner than the default
+        self._cache = TLRUCache(maxsize=maxsize, ttu=lambda _key, value, now: now + value[0], timer=timer)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case- and whitespace-insensitive form of a query"""
+        return " ".join(query.casefold().split())
+
+    @staticmethod
+    def make_key(scope: str, query: str) -> str:
+        return hashlib.sha256(
+            json.dumps({"s": scope, "q": ExactCache.normalize(query)}, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: str, result: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """Store a result (minus per-call fields) for ttl_seconds, or the cache default"""
+        value = {k: copy.deepcopy(v) for k, v in result.items() if k not in self.VOLATILE_FIELDS}
+        self._cache[key] = (ttl_seconds or self.ttl_seconds, value)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class LLMCache:
+    """
+    Semantic cache in front of the healthcare workflow
+
+    Queries are embedded with the shared embedding model and compared (cosine)
+    against previous queries in the same scope. A hit above the similarity
+    threshold returns the stored workflow result without running the workflow.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], List[float]],
+        backend: Optional[InMemoryCacheBackend] = None,
+        similarity_threshold: float = 0.92,
+        ttl_seconds: float = 3600,
+    ):
+        self.embed_fn = embed_fn
+        self.backend = backend or InMemoryCacheBackend()
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    async def embed(self, query: str) -> np.ndarray:
+        """Embed and L2-normalize a query (runs the model off the event loop)"""
+        vector = np.asarray(await asyncio.to_thread(self.embed_fn, query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def has_candidates(self, scope: str) -> bool:
+        """Whether a lookup in this scope could hit - lets callers skip embedding when it can't"""
+        return self.backend.has_scope(scope)
+
+    def get(self, scope: str, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return a copy of the best cached result above the threshold, if any"""
+        entries = self.backend.entries(scope)
+        if entries:
+            similarities = np.stack([e[1] for e in entries]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                entry_id, _, value = entries[best]
+                self.backend.touch(scope, entry_id)
+                self.hits += 1
+                logger.info(f"⚡ Semantic cache hit (similarity {similarities[best]:.3f})")
+                return copy.deepcopy(value)
+        self.misses += 1
+        return None
+
+    def put(self, scope: str, vector: np.ndarray, result: Dict[str, Any]) -> None:
+        self.backend.add(scope, vector, copy.deepcopy(result), self.ttl_seconds)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
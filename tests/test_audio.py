@@ -0,0 +1,133 @@
+"""Unit tests for the audio helpers and the /audio static mount"""
+
+import asyncio
+import io
+import os
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from starlette.exceptions import HTTPException  # noqa: E402
+
+from src.utils import audio  # noqa: E402
+from src.utils.audio import CachedAudioFiles, audio_cache_key, clean_text_for_tts, compress_for_whisper  # noqa: E402
+
+
+def make_scope(headers=()):
+    return {"type": "http", "method": "GET", "headers": [(k.encode(), v.encode()) for k, v in headers]}
+
+
+@pytest.fixture
+def files(tmp_path):
+    served = tmp_path / "audio_cache"
+    work = tmp_path / "audio_cache_work"
+    served.mkdir()
+    work.mkdir()
+    return CachedAudioFiles(directory=str(served), work_dir=str(work), pending_timeout=1, poll_interval=0.01)
+
+
+# ---------- helpers ----------
+
+def test_compress_passes_small_uploads_through():
+    upload = io.BytesIO(b"x" * 100)
+    out, name = compress_for_whisper(upload, 100, "voice.webm")
+    assert out is upload
+    assert name == "voice.webm"
+
+
+def test_compress_passes_through_without_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio, "FFMPEG_AVAILABLE", False)
+    size = audio.TRANSCODE_MIN_BYTES * 2
+    upload = io.BytesIO(b"x" * size)
+    out, name = compress_for_whisper(upload, size, "voice.webm")
+    assert out is upload
+    assert name == "voice.webm"
+
+
+def test_audio_cache_key_is_stable_and_filename_safe():
+    key = audio_cache_key("namaste")
+    assert key == audio_cache_key("namaste")
+    assert key != audio_cache_key("namaste!")
+    assert len(key) == 32
+    assert all(c in "0123456789abcdef" for c in key)
+
+
+def test_clean_text_for_tts_strips_markup():
+    text = "### Tips\n**Drink** water [Source: WHO] [1]\n- rest 😊"
+    assert clean_text_for_tts(text) == "Tips. Drink water . rest"
+
+
+# ---------- CachedAudioFiles ----------
+
+def test_begin_and_finish_keep_markers_out_of_served_dir(files):
+    async def run():
+        assert await files.begin("a.mp3")
+        assert not await files.begin("a.mp3")
+        assert os.listdir(files.directory) == []
+        assert os.listdir(files.work_dir) == ["a.mp3.pending"]
+        event = files.pending["a.mp3"]
+        await files.finish("a.mp3")
+        assert event.is_set()
+        assert os.listdir(files.work_dir) == []
+
+    asyncio.run(run())
+
+
+def test_part_path_is_in_work_dir(files):
+    path = files.part_path("a.mp3")
+    assert os.path.dirname(path) == files.work_dir
+    assert path.endswith(CachedAudioFiles.PART_SUFFIX)
+    assert path != files.part_path("a.mp3")
+
+
+def test_marker_from_other_worker_blocks_begin(files):
+    open(os.path.join(files.work_dir, "a.mp3.pending"), "w").close()
+    assert files.is_pending_elsewhere("a.mp3")
+    assert not asyncio.run(files.begin("a.mp3"))
+
+
+def test_stale_marker_is_ignored(files):
+    marker = os.path.join(files.work_dir, "a.mp3.pending")
+    open(marker, "w").close()
+    os.utime(marker, (0, 0))
+    assert not files.is_pending_elsewhere("a.mp3")
+
+
+@pytest.mark.parametrize("name", ["a.mp3.pending", "a.mp3.1234abcd.part"])
+def test_bookkeeping_files_are_not_served(files, name):
+    # Even if one ends up in the served directory (e.g. left by an older version)
+    open(os.path.join(files.directory, name), "w").close()
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(files.get_response(name, make_scope()))
+    assert exc.value.status_code == 404
+
+
+def test_serves_with_content_hash_etag(files):
+    with open(os.path.join(files.directory, "abc123.mp3"), "wb") as f:
+        f.write(b"ID3")
+    response = asyncio.run(files.get_response("abc123.mp3", make_scope()))
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"abc123"'
+    assert "immutable" in response.headers["cache-control"]
+
+    response = asyncio.run(files.get_response("abc123.mp3", make_scope([("if-none-match", '"abc123"')])))
+    assert response.status_code == 304
+
+
+def test_request_waits_for_pending_job(files):
+    async def run():
+        await files.begin("abc123.mp3")
+
+        async def synthesize():
+            await asyncio.sleep(0.05)
+            with open(os.path.join(files.directory, "abc123.mp3"), "wb") as f:
+                f.write(b"ID3")
+            await files.finish("abc123.mp3")
+
+        job = asyncio.create_task(synthesize())
+        response = await files.get_response("abc123.mp3", make_scope())
+        await job
+        return response
+
+    assert asyncio.run(run()).status_code == 200
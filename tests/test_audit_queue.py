@@ -0,0 +1,113 @@
+"""Unit tests for the batched audit log writer"""
+
+import asyncio
+
+from src.utils.audit_queue import AuditLogWriter
+
+
+class FakeCollection:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.batches.append(list(docs))
+
+
+def test_queued_docs_are_written_in_batches():
+    async def run():
+        collection = FakeCollection()
+        writer = AuditLogWriter(batch_size=3)
+        writer.start(collection)
+        for i in range(7):
+            await writer.put({"n": i})
+        await writer.stop()
+        return collection.batches
+
+    batches = asyncio.run(run())
+    assert [doc["n"] for batch in batches for doc in batch] == list(range(7))
+    assert max(len(batch) for batch in batches) <= 3
+
+
+def test_stop_flushes_everything_queued():
+    async def run():
+        collection = FakeCollection()
+        writer = AuditLogWriter()
+        writer.start(collection)
+        for i in range(250):
+            await writer.put({"n": i})
+        await writer.stop()
+        return collection.batches
+
+    assert sum(len(batch) for batch in asyncio.run(run())) == 250
+
+
+def test_on_inserted_gets_each_stored_batch():
+    seen = []
+
+    async def run():
+        writer = AuditLogWriter(on_inserted=seen.append)
+        writer.start(FakeCollection())
+        await writer.put({"n": 1})
+        await writer.put({"n": 2})
+        await writer.stop()
+
+    asyncio.run(run())
+    assert [doc["n"] for batch in seen for doc in batch] == [1, 2]
+
+
+def test_failed_write_skips_hook_and_keeps_running():
+    seen = []
+
+    async def run():
+        collection = FakeCollection(fail=True)
+        writer = AuditLogWriter(on_inserted=seen.append)
+        writer.start(collection)
+        await writer.put({"n": 1})
+        await writer._queue.join()
+        collection.fail = False
+        await writer.put({"n": 2})
+        await writer.stop()
+        return collection.batches
+
+    assert asyncio.run(run()) == [[{"n": 2}]]
+    assert seen == [[{"n": 2}]]
+
+
+def test_hook_error_does_not_stop_writer():
+    def broken_hook(batch):
+        raise RuntimeError("chain unavailable")
+
+    async def run():
+        collection = FakeCollection()
+        writer = AuditLogWriter(on_inserted=broken_hook)
+        writer.start(collection)
+        await writer.put({"n": 1})
+        await writer._queue.join()
+        await writer.put({"n": 2})
+        await writer.stop()
+        return collection.batches
+
+    assert sum(len(batch) for batch in asyncio.run(run())) == 2
+
+
+def test_full_buffer_applies_back_pressure():
+    async def run():
+        writer = AuditLogWriter(max_pending=2)
+        # No worker yet - the buffer can only fill up
+        await writer.put({"n": 1})
+        await writer.put({"n": 2})
+        blocked = asyncio.ensure_future(writer.put({"n": 3}))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        collection = FakeCollection()
+        writer.start(collection)
+        await asyncio.wait_for(blocked, 1)
+        await writer.stop()
+        return collection.batches
+
+    assert sum(len(batch) for batch in asyncio.run(run())) == 3
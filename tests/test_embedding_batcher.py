@@ -0,0 +1,115 @@
+"""Unit tests for the query embedding microbatcher"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.embeddings.batcher import EmbeddingBatcher
+
+
+def run_concurrently(batcher, texts):
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        futures = [pool.submit(batcher.embed, text) for text in texts]
+        return [future.result(timeout=5) for future in futures]
+
+
+def test_single_call_returns_its_vector():
+    batcher = EmbeddingBatcher(lambda texts: [[float(len(t))] for t in texts])
+    assert batcher.embed("abc") == [3.0]
+
+
+def test_concurrent_calls_share_one_model_call():
+    calls = []
+    release = threading.Event()
+
+    def embed_batch(texts):
+        calls.append(list(texts))
+        if len(calls) == 1:
+            release.wait(5)  # hold the first call so the rest queue up behind it
+        return [[float(len(t))] for t in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, max_batch=16, max_wait=0.05)
+    first = ThreadPoolExecutor(max_workers=1).submit(batcher.embed, "x")
+    while not calls:
+        threading.Event().wait(0.001)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(batcher.embed, "y" * n) for n in range(1, 9)]
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert first.result(timeout=5) == [1.0]
+    # Each caller gets the vector for its own text, in whatever batch it landed
+    assert results == [[float(n)] for n in range(1, 9)]
+    assert len(calls) < 1 + 8
+    assert sorted(t for batch in calls[1:] for t in batch) == sorted("y" * n for n in range(1, 9))
+
+
+def test_max_batch_caps_each_call():
+    sizes = []
+
+    def embed_batch(texts):
+        sizes.append(len(texts))
+        return [[0.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, max_batch=2, max_wait=0.05)
+    run_concurrently(batcher, [str(i) for i in range(6)])
+    assert max(sizes) <= 2
+
+
+def test_backend_error_reaches_every_caller():
+    def embed_batch(texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(embed_batch, max_wait=0.05)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(batcher.embed, str(i)) for i in range(4)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="model unavailable"):
+                future.result(timeout=5)
+
+
+@pytest.mark.parametrize("returned", [0, 2])
+def test_wrong_vector_count_fails_instead_of_hanging(returned):
+    batcher = EmbeddingBatcher(lambda texts: [[0.0]] * returned)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(batcher.embed, "text")
+        with pytest.raises(ValueError, match="vectors for 1 texts"):
+            future.result(timeout=5)
+
+
+def test_short_batch_fails_every_caller():
+    started = threading.Event()
+    release = threading.Event()
+
+    def embed_batch(texts):
+        if not started.is_set():
+            started.set()
+            release.wait(5)
+            return [[0.0] for _ in texts]
+        return [[0.0]]  # one vector for a multi-text batch
+
+    batcher = EmbeddingBatcher(embed_batch, max_wait=0.05)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pool.submit(batcher.embed, "warm-up")
+        started.wait(5)
+        futures = [pool.submit(batcher.embed, str(i)) for i in range(3)]
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(timeout=5)
+
+
+def test_batcher_keeps_working_after_a_failure():
+    state = {"fail": True}
+
+    def embed_batch(texts):
+        if state.pop("fail", False):
+            raise RuntimeError("transient")
+        return [[1.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed_batch)
+    with pytest.raises(RuntimeError):
+        batcher.embed("a")
+    assert batcher.embed("b") == [1.0]
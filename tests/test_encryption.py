@@ -0,0 +1,66 @@
+"""Unit tests for the PHI encryption manager and its per-salt cipher cache"""
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from src.security.encryption import PHIEncryptionManager  # noqa: E402
+
+
+@pytest.fixture
+def manager():
+    return PHIEncryptionManager(PHIEncryptionManager.generate_master_key())
+
+
+def test_round_trip(manager):
+    salt = manager.generate_user_salt()
+    token = manager.encrypt("diabetes", salt)
+    assert token != "diabetes"
+    assert manager.decrypt(token, salt) == "diabetes"
+
+
+def test_key_is_derived_once_per_salt(manager, monkeypatch):
+    derivations = []
+    derive = manager._derive_key
+
+    def counting_derive(salt):
+        derivations.append(salt)
+        return derive(salt)
+
+    monkeypatch.setattr(manager, "_derive_key", counting_derive)
+    salt_a, salt_b = manager.generate_user_salt(), manager.generate_user_salt()
+    for _ in range(3):
+        manager.decrypt(manager.encrypt("x", salt_a), salt_a)
+    manager.encrypt("x", salt_b)
+    assert derivations == [salt_a, salt_b]
+
+
+def test_cached_cipher_is_per_salt(manager):
+    token = manager.encrypt("asthma", manager.generate_user_salt())
+    with pytest.raises(Exception):
+        manager.decrypt(token, manager.generate_user_salt())
+
+
+def test_cache_is_per_master_key(manager):
+    salt = manager.generate_user_salt()
+    token = manager.encrypt("asthma", salt)
+    other = PHIEncryptionManager(PHIEncryptionManager.generate_master_key())
+    with pytest.raises(Exception):
+        other.decrypt(token, salt)
+
+
+def test_decrypt_many_marks_failures(manager):
+    salt = manager.generate_user_salt()
+    tokens = [manager.encrypt("a", salt), "not-a-token", manager.encrypt("b", salt)]
+    assert manager.decrypt_many(tokens, salt) == ["a", None, "b"]
+
+
+def test_rotate_key(manager):
+    old_salt, new_salt = manager.generate_user_salt(), manager.generate_user_salt()
+    rotated = manager.rotate_key(old_salt, new_salt, manager.encrypt("bp meds", old_salt))
+    assert manager.decrypt(rotated, new_salt) == "bp meds"
+
+
+def test_rejects_bad_master_key():
+    with pytest.raises(ValueError):
+        PHIEncryptionManager("abc")
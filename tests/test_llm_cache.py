@@ -0,0 +1,125 @@
+"""Unit tests for the /chat response caches"""
+
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cachetools")
+
+from src.utils import llm_cache  # noqa: E402
+from src.utils.llm_cache import ExactCache, InMemoryCacheBackend, LLMCache  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# ---------- ExactCache ----------
+
+def test_exact_cache_strips_volatile_fields():
+    cache = ExactCache()
+    key = ExactCache.make_key("scope", "hello")
+    cache.put(key, {"output": "hi", "timestamp": "now", "profile_updated": True})
+    assert cache.get(key) == {"output": "hi"}
+
+
+def test_exact_cache_returns_copies():
+    cache = ExactCache()
+    key = ExactCache.make_key("scope", "hello")
+    result = {"output": {"text": "hi"}}
+    cache.put(key, result)
+    result["output"]["text"] = "changed after put"
+    cached = cache.get(key)
+    cached["output"]["text"] = "changed by caller"
+    assert cache.get(key) == {"output": {"text": "hi"}}
+
+
+def test_exact_cache_key_normalizes_case_and_whitespace():
+    assert ExactCache.make_key("s", "  What is  Yoga? ") == ExactCache.make_key("s", "what is yoga?")
+    assert ExactCache.make_key("s", "what is yoga?") != ExactCache.make_key("other", "what is yoga?")
+    assert ExactCache.make_key("s", "what is yoga?") != ExactCache.make_key("s", "what is yoga")
+
+
+def test_exact_cache_ttl_and_per_entry_override():
+    clock = FakeClock()
+    cache = ExactCache(ttl_seconds=3600, timer=clock)
+    cache.put("default", {"output": "a"})
+    cache.put("short", {"output": "b"}, ttl_seconds=300)
+
+    clock.now += 301
+    assert cache.get("short") is None
+    assert cache.get("default") == {"output": "a"}
+
+    clock.now += 3600
+    assert cache.get("default") is None
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+
+# ---------- LLMCache ----------
+
+VECTORS = {
+    "a": [1.0, 0.0, 0.0],
+    "a-ish": [0.95, 0.05, 0.0],  # cosine ~0.999 with "a"
+    "a-far": [0.8, 0.6, 0.0],  # cosine 0.8 with "a"
+    "b": [0.0, 1.0, 0.0],
+}
+
+
+def make_cache(**kwargs):
+    return LLMCache(embed_fn=lambda query: VECTORS[query], **kwargs)
+
+
+def embed(cache, query):
+    return asyncio.run(cache.embed(query))
+
+
+def test_embed_normalizes():
+    vector = embed(make_cache(), "a-far")
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+
+
+def test_semantic_hit_above_threshold_only():
+    cache = make_cache(similarity_threshold=0.92)
+    cache.put("scope", embed(cache, "a"), {"output": "answer a"})
+
+    assert cache.get("scope", embed(cache, "a-ish")) == {"output": "answer a"}
+    assert cache.get("scope", embed(cache, "a-far")) is None
+    assert cache.get("scope", embed(cache, "b")) is None
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+
+def test_semantic_lookup_is_scoped():
+    cache = make_cache()
+    cache.put("user-1", embed(cache, "a"), {"output": "answer a"})
+    assert cache.has_candidates("user-1")
+    assert not cache.has_candidates("user-2")
+    assert cache.get("user-2", embed(cache, "a")) is None
+
+
+def test_semantic_entries_expire(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = make_cache(ttl_seconds=60)
+    cache.put("scope", embed(cache, "a"), {"output": "answer a"})
+
+    clock.now += 59
+    assert cache.get("scope", embed(cache, "a")) == {"output": "answer a"}
+    clock.now += 2
+    assert cache.get("scope", embed(cache, "a")) is None
+    assert not cache.has_candidates("scope")
+
+
+def test_backend_evicts_least_recently_used():
+    backend = InMemoryCacheBackend(max_entries=2)
+    vector = np.array([1.0, 0.0], dtype=np.float32)
+    backend.add("s", vector, "first", 60)
+    backend.add("s", vector, "second", 60)
+    first_id = backend.entries("s")[0][0]
+    backend.touch("s", first_id)
+    backend.add("s", vector, "third", 60)
+    assert [value for _, _, value in backend.entries("s")] == ["first", "third"]
@@ -0,0 +1,51 @@
+"""Unit tests for the Merkle helpers behind batched audit blocks"""
+
+import hashlib
+
+import pytest
+
+from src.blockchain.merkle import leaf_hash, merkle_proof, merkle_tree, verify_merkle_proof
+
+
+def _leaf(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def test_single_leaf_is_its_own_root():
+    leaf = _leaf("a")
+    assert merkle_tree([leaf]) == [[leaf]]
+    assert merkle_proof([[leaf]], 0) == []
+    assert verify_merkle_proof(leaf, [], leaf)
+
+
+def test_empty_tree_rejected():
+    with pytest.raises(ValueError):
+        merkle_tree([])
+
+
+@pytest.mark.parametrize("count", [2, 3, 4, 5, 8, 13])
+def test_every_leaf_proves_inclusion(count):
+    leaves = [_leaf(str(i)) for i in range(count)]
+    levels = merkle_tree(leaves)
+    root = levels[-1][0]
+    for index, leaf in enumerate(leaves):
+        assert verify_merkle_proof(leaf, merkle_proof(levels, index), root)
+
+
+def test_proof_rejects_other_leaf():
+    leaves = [_leaf(str(i)) for i in range(4)]
+    levels = merkle_tree(leaves)
+    assert not verify_merkle_proof(_leaf("x"), merkle_proof(levels, 1), levels[-1][0])
+
+
+def test_duplicated_last_leaf_shares_root():
+    # Why batch blocks also record leaf_count
+    a, b, c = _leaf("a"), _leaf("b"), _leaf("c")
+    assert merkle_tree([a, b, c])[-1][0] == merkle_tree([a, b, c, c])[-1][0]
+
+
+def test_leaf_hash_commits_to_every_field():
+    record = {"anonymous_id": "anon", "action": "LOGIN", "metadata": {"ip": "1.2.3.4"}, "timestamp": "t"}
+    assert leaf_hash(record) == leaf_hash(dict(reversed(list(record.items()))))
+    for field, value in (("anonymous_id", "other"), ("action", "LOGOUT"), ("metadata", {}), ("timestamp", "t2")):
+        assert leaf_hash({**record, field: value}) != leaf_hash(record)
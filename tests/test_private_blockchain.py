@@ -0,0 +1,88 @@
+"""Tamper detection for Merkle-batched blocks in the SQLite chain"""
+
+import asyncio
+import json
+import multiprocessing
+import sqlite3
+
+import pytest
+
+pytest.importorskip("cachetools")
+
+from src.blockchain.private_blockchain import PrivateBlockchain  # noqa: E402
+
+
+@pytest.fixture
+def chain(tmp_path):
+    blockchain = PrivateBlockchain(db_path=str(tmp_path / "chain.db"))
+    entries = [
+        {"anonymous_id": f"anon-{i}", "action": "DATA_ACCESS", "data_hash": f"{i:064x}",
+         "metadata": {"resource_type": "session", "resource_id": str(i)}}
+        for i in range(3)
+    ]
+    result = asyncio.run(blockchain.log_audit_batch(entries))
+    assert result["leaf_count"] == 3
+    return blockchain
+
+
+def _execute(chain, sql, params=()):
+    conn = sqlite3.connect(chain.db_path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def test_untouched_batch_verifies(chain):
+    assert chain.verify_chain_integrity()
+
+
+@pytest.mark.parametrize("column, value", [
+    ("anonymous_id", "someone-else"),
+    ("action", "DELETE"),
+    ("timestamp", "2000-01-01T00:00:00"),
+])
+def test_rewritten_column_is_detected(chain, column, value):
+    _execute(chain, f"UPDATE audit_logs SET {column} = ? WHERE id = 2", (value,))
+    assert not chain.verify_chain_integrity()
+
+
+def test_rewritten_metadata_is_detected(chain):
+    conn = sqlite3.connect(chain.db_path)
+    metadata = json.loads(conn.execute("SELECT metadata FROM audit_logs WHERE id = 1").fetchone()[0])
+    conn.close()
+    metadata["resource_id"] = "999"
+    _execute(chain, "UPDATE audit_logs SET metadata = ? WHERE id = 1", (json.dumps(metadata),))
+    assert not chain.verify_chain_integrity()
+
+
+def test_appended_duplicate_entry_is_detected(chain):
+    # [a, b, c, c] has the same root as [a, b, c] - only leaf_count catches it
+    _execute(chain, """
+        INSERT INTO audit_logs (block_number, anonymous_id, action, data_hash, metadata, timestamp)
+        SELECT block_number, anonymous_id, action, data_hash, metadata, timestamp FROM audit_logs WHERE id = 3
+    """)
+    assert not chain.verify_chain_integrity()
+
+
+def _append_batches(db_path, worker, count):
+    blockchain = PrivateBlockchain(db_path=db_path)
+    for i in range(count):
+        entry = {"anonymous_id": f"worker-{worker}", "action": "LOGIN", "data_hash": f"{i:064x}", "metadata": {}}
+        assert asyncio.run(blockchain.log_audit_batch([entry])) is not None
+
+
+def test_concurrent_processes_do_not_fork_the_chain(chain):
+    # Separate processes don't share the in-process lock - the SQLite write lock must serialize them
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_append_batches, args=(chain.db_path, w, 10)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    conn = sqlite3.connect(chain.db_path)
+    previous_hashes = [row[0] for row in conn.execute("SELECT previous_hash FROM blocks")]
+    conn.close()
+    assert len(previous_hashes) == len(set(previous_hashes)) == 1 + 1 + 40
+    assert chain.verify_chain_integrity()
@@ -0,0 +1,130 @@
+"""Unit tests for the audit chain read cache"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("cachetools")
+
+from src.blockchain.read_cache import ChainReadCache  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"value": self.calls}
+
+
+def test_hit_until_tip_moves():
+    tip = [5]
+    compute = Counter()
+    cache = ChainReadCache(lambda: tip[0])
+
+    assert cache.get(("statistics",), compute) == {"value": 1}
+    assert cache.get(("statistics",), compute) == {"value": 1}
+
+    tip[0] = 6
+    assert cache.get(("statistics",), compute) == {"value": 2}
+    assert compute.calls == 2
+
+
+def test_keys_are_separate():
+    compute = Counter()
+    cache = ChainReadCache(lambda: 1)
+    cache.get(("audit_trail", "anon-a"), compute)
+    cache.get(("audit_trail", "anon-b"), compute)
+    assert compute.calls == 2
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    compute = Counter()
+    cache = ChainReadCache(lambda: 1, ttl=60, timer=clock)
+
+    cache.get(("statistics",), compute)
+    clock.now += 59
+    cache.get(("statistics",), compute)
+    assert compute.calls == 1
+
+    clock.now += 2
+    cache.get(("statistics",), compute)
+    assert compute.calls == 2
+
+
+def test_tip_failure_reads_uncached():
+    def broken_tip():
+        raise RuntimeError("database unreachable")
+
+    compute = Counter()
+    cache = ChainReadCache(broken_tip)
+    assert cache.get(("statistics",), compute) == {"value": 1}
+    assert cache.get(("statistics",), compute) == {"value": 2}
+
+
+def test_postgres_tip_height_reuses_connection():
+    psycopg2 = pytest.importorskip("psycopg2")
+    from src.blockchain.postgres_blockchain import PostgresBlockchain
+
+    class FakeCursor:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql):
+            if self.conn.drop_next:
+                self.conn.drop_next = False
+                self.conn.closed = 1
+                raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+        def fetchone(self):
+            return (42,)
+
+    class FakeConnection:
+        def __init__(self):
+            self.closed = 0
+            self.autocommit = False
+            self.drop_next = False
+
+        def cursor(self):
+            return FakeCursor(self)
+
+        def close(self):
+            self.closed = 1
+
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    # Skip __init__ - it connects and creates the schema
+    chain = PostgresBlockchain.__new__(PostgresBlockchain)
+    chain._tip_conn = None
+    chain._tip_lock = threading.Lock()
+    chain._get_connection = connect
+
+    assert chain.get_tip_height() == 42
+    assert chain.get_tip_height() == 42
+    assert len(opened) == 1
+    assert opened[0].autocommit
+
+    # A dropped connection is replaced once, transparently
+    opened[0].drop_next = True
+    assert chain.get_tip_height() == 42
+    assert len(opened) == 2
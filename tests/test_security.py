@@ -0,0 +1,67 @@
+"""Unit tests for the password verification cache"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("passlib")
+pytest.importorskip("jose")
+
+from src.auth import security  # noqa: E402
+
+
+@pytest.fixture
+def stored_hash():
+    security._verified_cache.clear()
+    return security.get_password_hash("correct horse")
+
+
+@pytest.fixture
+def kdf_calls(monkeypatch):
+    calls = []
+    verify = security.pwd_context.verify
+
+    def counting_verify(plain, hashed):
+        calls.append(plain)
+        return verify(plain, hashed)
+
+    monkeypatch.setattr(security.pwd_context, "verify", counting_verify)
+    return calls
+
+
+def test_success_is_cached(stored_hash, kdf_calls):
+    assert security.verify_password("correct horse", stored_hash)
+    assert security.verify_password("correct horse", stored_hash)
+    assert len(kdf_calls) == 1
+
+
+def test_failures_are_not_cached(stored_hash, kdf_calls):
+    assert not security.verify_password("wrong", stored_hash)
+    assert not security.verify_password("wrong", stored_hash)
+    assert len(kdf_calls) == 2
+    assert len(security._verified_cache) == 0
+
+
+def test_cache_does_not_leak_across_passwords(stored_hash):
+    assert security.verify_password("correct horse", stored_hash)
+    assert not security.verify_password("correct horse!", stored_hash)
+
+
+def test_cache_is_keyed_on_stored_hash(stored_hash):
+    # A password change gives a new hash - the old cached success must not apply
+    assert security.verify_password("correct horse", stored_hash)
+    new_hash = security.get_password_hash("battery staple")
+    assert not security.verify_password("correct horse", new_hash)
+
+
+def test_cache_does_not_hold_plaintext(stored_hash):
+    security.verify_password("correct horse", stored_hash)
+    assert all("correct horse" not in part for key in security._verified_cache for part in key)
+
+
+def test_async_helpers():
+    async def run():
+        hashed = await security.get_password_hash_async("pw")
+        return await security.verify_password_async("pw", hashed), await security.verify_password_async("no", hashed)
+
+    assert asyncio.run(run()) == (True, False)